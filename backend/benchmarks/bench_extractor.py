@@ -0,0 +1,218 @@
+"""
+Offline benchmark of the extractor's public functions against recorded
+responses (YFINANCE_BACKEND=replay:DIR), reporting latency, allocations and
+throughput per function.
+
+By default a fixture directory of synthetic statements is generated; pass
+--fixtures to replay responses captured with YFINANCE_BACKEND=record:DIR.
+
+Usage:
+    python3 benchmarks/bench_extractor.py [--rows 400] [--periods 8] [--iterations 50]
+    python3 benchmarks/bench_extractor.py --fixtures /tmp/recorded --symbols AAPL,INFY.NS
+    python3 benchmarks/bench_extractor.py --warm --json > results.json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+UTILS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils')
+sys.path.insert(0, UTILS_DIR)
+from replay_backend import ReplayBackend  # noqa: E402
+
+INDEX_SYMBOLS = ['^NSEI', '^NSEBANK', '^CNXIT', '^NSEMDCP50', '^BSESN', '^NYA', '^IXIC']
+
+# Real Yahoo labels first so field selection and currency conversion do real work
+STATEMENT_FIELDS = [
+    'Total Revenue', 'Cost Of Revenue', 'Gross Profit', 'Operating Expense', 'Operating Income',
+    'Selling General And Administration', 'EBITDA', 'EBIT', 'Interest Expense', 'Pretax Income',
+    'Tax Provision', 'Net Income', 'Net Income Continuous Operations', 'Diluted EPS', 'Basic EPS',
+    'Total Assets', 'Total Debt', 'Net Debt', 'Working Capital', 'Invested Capital',
+    'Cash And Cash Equivalents', 'Stockholders Equity', 'Free Cash Flow', 'Operating Cash Flow',
+    'Capital Expenditure', 'Repurchase Of Capital Stock',
+]
+
+
+def make_statement(rows, periods, freq, rng):
+    """Statement with real labels padded to `rows` fields, latest period first"""
+    index = STATEMENT_FIELDS[:rows] + [f'Synthetic Field {i}' for i in range(max(0, rows - len(STATEMENT_FIELDS)))]
+    values = rng.normal(1e9, 5e8, size=(len(index), periods))
+    values[rng.random(size=values.shape) < 0.1] = np.nan
+    columns = pd.date_range(end='2024-12-31', periods=periods, freq=freq)[::-1]
+    return pd.DataFrame(values, index=index, columns=columns)
+
+
+def make_info(symbol, rng):
+    listed_in_india = symbol.endswith('.NS')
+    return {
+        'shortName': f'{symbol} Synthetic Ltd',
+        'currency': 'INR' if listed_in_india else 'USD',
+        'financialCurrency': 'USD',
+        'currentPrice': float(rng.uniform(10, 500)),
+        'marketCap': float(rng.uniform(1e9, 1e12)),
+        'totalCash': float(rng.uniform(1e8, 1e10)),
+        'totalDebt': float(rng.uniform(1e8, 1e10)),
+        'totalRevenue': float(rng.uniform(1e9, 1e11)),
+        'ebitda': float(rng.uniform(1e8, 1e10)),
+        'bookValue': float(rng.uniform(1, 100)),
+        'returnOnEquity': float(rng.uniform(0, 0.4)),
+        'longBusinessSummary': 'Synthetic company used for benchmarking. ' * 40,
+    }
+
+
+def make_quote(symbol, rng):
+    price = float(rng.uniform(100, 50000))
+    return {
+        'symbol': symbol,
+        'shortName': symbol,
+        'fullExchangeName': 'Synthetic',
+        'regularMarketPrice': price,
+        'regularMarketPreviousClose': price * 0.99,
+        'regularMarketOpen': price * 0.995,
+        'regularMarketDayLow': price * 0.98,
+        'regularMarketDayHigh': price * 1.02,
+        'fiftyTwoWeekLow': price * 0.7,
+        'fiftyTwoWeekHigh': price * 1.3,
+        'fiftyDayAverage': price,
+        'twoHundredDayAverage': price * 0.95,
+    }
+
+
+def build_fixtures(directory, symbols, rows, periods, seed=0):
+    rng = np.random.default_rng(seed)
+    backend = ReplayBackend(directory)
+    for symbol in symbols:
+        for dataset in ('income_stmt', 'balance_sheet', 'cash_flow'):
+            backend.save(symbol, dataset, make_statement(rows, periods, pd.offsets.YearEnd(), rng))
+        backend.save(symbol, 'quarterly_income_stmt', make_statement(rows, periods * 4, pd.offsets.QuarterEnd(), rng))
+        backend.save(symbol, 'info', make_info(symbol, rng))
+        backend.save(symbol, 'quote', make_quote(symbol, rng))
+    for symbol in INDEX_SYMBOLS:
+        backend.save(symbol, 'quote', make_quote(symbol, rng))
+
+
+def measure(func, iterations, setup, items=1):
+    """
+    Run func `iterations` times (calling setup before each run, untimed) and
+    once more under tracemalloc
+
+    Returns:
+        dict: Latency percentiles in ms, throughput, and allocation figures
+    """
+    latencies = []
+    for _ in range(iterations):
+        setup()
+        started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started)
+
+    setup()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    func()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated = [stat for stat in after.compare_to(before, 'filename') if stat.size_diff > 0]
+
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'min_ms': round(latencies[0] * 1000, 3),
+        'median_ms': round(statistics.median(latencies) * 1000, 3),
+        'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 3),
+        'throughput_per_s': round(items * len(latencies) / sum(latencies), 1),
+        'peak_alloc_kb': round(peak / 1024, 1),
+        'retained_kb': round(sum(stat.size_diff for stat in allocated) / 1024, 1),
+        'retained_blocks': sum(stat.count_diff for stat in allocated),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fixtures', help="Replay this recorded directory instead of generating one")
+    parser.add_argument('--symbols', default='AAPL,MSFT,INFY.NS,TCS.NS',
+                        help="Comma-separated symbols to cycle through")
+    parser.add_argument('--rows', type=int, default=400, help="Fields per synthetic statement")
+    parser.add_argument('--periods', type=int, default=8, help="Annual periods per synthetic statement")
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warm', action='store_true',
+                        help="Keep the dataset cache between runs (default: every run starts cold)")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    symbols = [s.strip() for s in args.symbols.split(',') if s.strip()]
+    fixtures = args.fixtures or tempfile.mkdtemp(prefix='yf-bench-')
+    if not args.fixtures:
+        build_fixtures(fixtures, symbols, args.rows, args.periods)
+
+    # The extractor reads its configuration at import time
+    os.environ['YFINANCE_BACKEND'] = f'replay:{fixtures}'
+    os.environ.setdefault('YFINANCE_FX_PROVIDER', 'static:USD/INR=83.2')
+    os.environ.pop('YFINANCE_CACHE_DIR', None)
+    os.environ.pop('YFINANCE_STORE_DIR', None)
+    import yfinanceextractor as extractor
+
+    setup = (lambda: None) if args.warm else extractor._cache.clear
+    position = {'next': 0}
+
+    def next_symbol():
+        symbol = symbols[position['next'] % len(symbols)]
+        position['next'] += 1
+        return symbol
+
+    usd_symbol = next((s for s in symbols if not s.endswith('.NS')), symbols[0])
+    nested = json.loads(extractor.get_company_financials(usd_symbol))
+    values = [pd.Timestamp('2024-03-31'), datetime(2024, 3, 31), float('nan'), 1.5e9, 42, 'text', None] * 100
+    summary = 'Synthetic company used for benchmarking. ' * 40
+
+    def serialize_values():
+        for value in values:
+            extractor.serialize_value(value)
+        extractor.serialize_value(summary, 'longBusinessSummary')
+
+    cases = [
+        ('get_company_financials', lambda: extractor.get_company_financials(next_symbol()), 1),
+        ('get_company_quarterly_financials', lambda: extractor.get_company_quarterly_financials(next_symbol()), 1),
+        ('convert_financial_data', lambda: extractor.convert_financial_data(nested, 83.2), 1),
+        ('serialize_value', serialize_values, len(values) + 1),
+        ('get_latest_stock_indices', lambda: extractor.get_latest_stock_indices(), 1),
+    ]
+
+    results = {}
+    try:
+        for name, func, items in cases:
+            func()  # first call pays lazy imports and fixture loading
+            results[name] = measure(func, args.iterations, setup, items)
+    finally:
+        if not args.fixtures:
+            shutil.rmtree(fixtures, ignore_errors=True)
+    source = fixtures if args.fixtures else f'synthetic, {args.rows} rows x {args.periods} years'
+
+    if args.json:
+        print(json.dumps({
+            'config': {'fixtures': source, 'symbols': symbols, 'rows': args.rows, 'periods': args.periods,
+                       'iterations': args.iterations, 'warm': args.warm},
+            'results': results,
+        }, indent=2))
+        return
+
+    mode = 'warm cache' if args.warm else 'cold cache'
+    print(f"fixtures: {source} ({mode}, {args.iterations} iterations)")
+    print(f"  {'function':<34}{'median ms':>10}{'p95 ms':>10}{'ops/s':>12}{'peak KB':>10}{'kept KB':>10}")
+    for name, r in results.items():
+        print(f"  {name:<34}{r['median_ms']:>10.3f}{r['p95_ms']:>10.3f}{r['throughput_per_s']:>12.1f}"
+              f"{r['peak_alloc_kb']:>10.1f}{r['retained_kb']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
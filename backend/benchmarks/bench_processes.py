@@ -0,0 +1,123 @@
+"""
+Scaling benchmark for process-mode batches: get_batch over a warm cache of
+synthetic statements, rendered in threads only (0 processes) and in worker
+pools of increasing size, reporting wall time, symbols/s and speedup.
+
+Upstream fetches are served from the warm cache, so the figures isolate the
+CPU-bound filtering, conversion and serialization that worker processes
+parallelize.
+
+Usage:
+    python3 benchmarks/bench_processes.py [--symbols 200] [--rows 400] [--periods 8]
+    python3 benchmarks/bench_processes.py --command quarterly --processes 0,1,2,4 --json
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from bench_extractor import build_fixtures
+
+
+def without_timestamps(result):
+    """A per-symbol result minus the wall-clock stamps that differ between runs"""
+    result = {k: v for k, v in result.items() if k != 'fetch_time'}
+    if isinstance(result.get('currency_conversion'), dict):
+        result['currency_conversion'] = {k: v for k, v in result['currency_conversion'].items()
+                                         if k != 'conversion_time'}
+    return result
+
+
+def process_counts(spec):
+    if spec:
+        return [int(n) for n in spec.split(',') if n.strip()]
+    cores = os.cpu_count() or 1
+    counts, n = [0, 1], 2
+    while n < cores:
+        counts.append(n)
+        n *= 2
+    return counts + ([cores] if cores > 1 else [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--command', default='financials', choices=('financials', 'quarterly'))
+    parser.add_argument('--symbols', type=int, default=200, help="Number of synthetic symbols in the batch")
+    parser.add_argument('--rows', type=int, default=400, help="Fields per synthetic statement")
+    parser.add_argument('--periods', type=int, default=8, help="Annual periods per synthetic statement")
+    parser.add_argument('--layout', default='records', choices=('records', 'columnar'))
+    parser.add_argument('--processes', help="Comma-separated worker counts (default: 0, 1, 2, 4, ... up to the core count)")
+    parser.add_argument('--workers', type=int, default=8, help="Coordinator threads (max_workers)")
+    parser.add_argument('--repeat', type=int, default=3, help="Batches per worker count; the best is reported")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    symbols = [f'SYN{i:04d}' + ('.NS' if i % 2 else '') for i in range(args.symbols)]
+    fixtures = tempfile.mkdtemp(prefix='yf-bench-')
+    build_fixtures(fixtures, symbols, args.rows, args.periods)
+
+    # The extractor reads its configuration at import time; worker processes
+    # inherit the environment
+    os.environ['YFINANCE_BACKEND'] = f'replay:{fixtures}'
+    os.environ.setdefault('YFINANCE_FX_PROVIDER', 'static:USD/INR=83.2')
+    os.environ.pop('YFINANCE_CACHE_DIR', None)
+    os.environ.pop('YFINANCE_STORE_DIR', None)
+    import yfinanceextractor as extractor
+
+    options = {'layout': args.layout}
+    results = []
+    try:
+        # Fill the dataset cache; every timed batch below is served from it
+        baseline = json.loads(extractor.get_batch(symbols, args.command, max_workers=args.workers,
+                                                  processes=0, **options))
+        for processes in process_counts(args.processes):
+            # Untimed run: starts the pool and pays the imports in every worker
+            output = extractor.get_batch(symbols, args.command, max_workers=args.workers,
+                                         processes=processes, **options)
+            matches = all(
+                without_timestamps(result) == without_timestamps(baseline[symbol])
+                for symbol, result in json.loads(output).items()
+            )
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                extractor.get_batch(symbols, args.command, max_workers=args.workers,
+                                    processes=processes, **options)
+                timings.append(time.perf_counter() - started)
+            best = min(timings)
+            results.append({
+                'processes': processes,
+                'wall_s': round(best, 4),
+                'symbols_per_s': round(len(symbols) / best, 1),
+                'matches_threads': matches,
+            })
+    finally:
+        extractor.shutdown_process_pools()
+        shutil.rmtree(fixtures, ignore_errors=True)
+
+    for result in results:
+        result['speedup'] = round(results[0]['wall_s'] / result['wall_s'], 2)
+
+    if args.json:
+        print(json.dumps({
+            'config': {'command': args.command, 'symbols': len(symbols), 'rows': args.rows,
+                       'periods': args.periods, 'layout': args.layout, 'workers': args.workers,
+                       'repeat': args.repeat, 'cpu_count': os.cpu_count(),
+                       'start_method': extractor.PROCESS_START_METHOD},
+            'results': results,
+        }, indent=2))
+        return
+
+    print(f"{args.command} x {len(symbols)} symbols ({args.rows} rows x {args.periods} years, {args.layout}), "
+          f"{os.cpu_count()} cores, {extractor.PROCESS_START_METHOD} workers, best of {args.repeat}")
+    print(f"  {'processes':>10}{'wall s':>10}{'symbols/s':>12}{'speedup':>10}{'same output':>13}")
+    for r in results:
+        print(f"  {r['processes']:>10}{r['wall_s']:>10.3f}{r['symbols_per_s']:>12.1f}{r['speedup']:>10.2f}"
+              f"{'yes' if r['matches_threads'] else 'NO':>13}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
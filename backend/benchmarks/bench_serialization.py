@@ -0,0 +1,80 @@
+"""
+Micro-benchmark: columnar serialize_statement vs. the to_dict() + per-cell
+serialize_value walk it replaced, on large synthetic statements, plus JSON
+encoding time and payload size per encoder and statement layout.
+
+Usage:
+    python3 benchmarks/bench_serialization.py [--rows 2000] [--periods 40] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+from json_codec import make_encoder  # noqa: E402
+from yfinanceextractor import serialize_statement, serialize_value  # noqa: E402
+
+
+def make_statement(rows, periods, nan_ratio=0.1, seed=0):
+    """Random statement with `rows` fields and `periods` year-end columns"""
+    rng = np.random.default_rng(seed)
+    values = rng.normal(1e9, 5e8, size=(rows, periods))
+    values[rng.random(size=values.shape) < nan_ratio] = np.nan
+    index = [f'Synthetic Field {i}' for i in range(rows)]
+    columns = pd.date_range(end='2024-12-31', periods=periods, freq=pd.offsets.YearEnd())[::-1]
+    return pd.DataFrame(values, index=index, columns=columns)
+
+
+def legacy_serialize(df, fields):
+    return {
+        str(k): {
+            str(inner_k): serialize_value(inner_v)
+            for inner_k, inner_v in v.items()
+            if inner_k in fields
+        }
+        for k, v in df.to_dict().items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--periods', type=int, default=40)
+    parser.add_argument('--fields', type=int, default=200, help="Number of rows selected")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    df = make_statement(args.rows, args.periods)
+    # Like key_fields: a plain list, with a few labels the statement doesn't have
+    fields = list(df.index[::max(1, args.rows // args.fields)][:args.fields]) + ['Missing Field A', 'Missing Field B']
+
+    assert legacy_serialize(df, fields) == serialize_statement(df, fields), "outputs differ"
+
+    print(f"statement: {args.rows} rows x {args.periods} periods, selecting {len(fields)} fields")
+    timings = {}
+    for name, func in (('to_dict + serialize_value', legacy_serialize), ('serialize_statement', serialize_statement)):
+        best = min(timeit.repeat(lambda: func(df, fields), number=1, repeat=args.repeat))
+        timings[name] = best
+        print(f"  {name:<28} {best * 1000:10.2f} ms")
+    print(f"  speedup: {timings['to_dict + serialize_value'] / timings['serialize_statement']:.1f}x")
+
+    encoders = [make_encoder('json')]
+    try:
+        encoders.append(make_encoder('orjson'))
+    except ImportError:
+        print("orjson is not installed; only the stdlib encoder is measured")
+    print("encoding:")
+    for layout in ('records', 'columnar'):
+        payload = serialize_statement(df, fields, layout=layout)
+        for encoder in encoders:
+            best = min(timeit.repeat(lambda: encoder.dumps(payload), number=1, repeat=args.repeat))
+            size = len(encoder.dumps(payload).encode('utf-8'))
+            print(f"  {layout:<9} {encoder.name:<7} {best * 1000:10.2f} ms {size / 1024:10.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
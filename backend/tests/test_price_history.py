@@ -0,0 +1,117 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'utils'))
+
+import price_history  # noqa: E402
+from price_history import FIELDS, HistoryStore  # noqa: E402
+
+
+def make_bars(start, periods):
+    # Every field holds the bar's day number, so a row whose columns come
+    # from different writes is easy to spot
+    index = pd.date_range(start, periods=periods, freq='D')
+    days = (index - pd.Timestamp('2020-01-01')).days.astype(float)
+    return pd.DataFrame({field: days for field in FIELDS}, index=index)
+
+
+def assert_aligned(bars):
+    days = (bars['date'] - np.datetime64('2020-01-01', 'D')).astype(float)
+    for field in FIELDS:
+        np.testing.assert_array_equal(bars[field], days)
+
+
+def write_in_subprocess(directory, method, start, periods):
+    # A separate process has its own mapping cache, like a second extractor
+    code = (
+        f"import sys; sys.path.insert(0, {os.path.abspath(os.path.dirname(price_history.__file__))!r})\n"
+        "import pandas as pd, price_history\n"
+        f"index = pd.date_range({start!r}, periods={periods}, freq='D')\n"
+        "days = (index - pd.Timestamp('2020-01-01')).days.astype(float)\n"
+        "bars = pd.DataFrame({field: days for field in price_history.FIELDS}, index=index)\n"
+        f"getattr(price_history.HistoryStore({directory!r}), {method!r})('TEST.NS', bars)\n"
+    )
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def test_reads_see_appends_from_other_processes(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append('TEST.NS', make_bars('2024-01-01', 5))
+    assert len(store.read('TEST.NS')['date']) == 5
+
+    write_in_subprocess(str(tmp_path), 'append', '2024-01-06', 3)
+    bars = store.read('TEST.NS')
+    assert len(bars['date']) == 8
+    assert store.last_date('TEST.NS') == pd.Timestamp('2024-01-08')
+    assert_aligned(bars)
+
+
+def test_reads_see_prepends_from_other_processes(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append('TEST.NS', make_bars('2024-01-10', 5))
+    assert store.first_date('TEST.NS') == pd.Timestamp('2024-01-10')
+
+    write_in_subprocess(str(tmp_path), 'prepend', '2024-01-01', 9)
+    bars = store.read('TEST.NS')
+    assert len(bars['date']) == 14
+    assert store.first_date('TEST.NS') == pd.Timestamp('2024-01-01')
+    assert_aligned(bars)
+
+
+def test_prepend_is_invisible_until_complete(tmp_path, monkeypatch):
+    writer = HistoryStore(str(tmp_path))
+    reader = HistoryStore(str(tmp_path))
+    writer.append('TEST.NS', make_bars('2024-01-10', 5))
+    before = {column: np.array(values) for column, values in reader.read('TEST.NS').items()}
+
+    real_open = open
+    seen = []
+
+    def interrupted_open(path, mode='r', *args, **kwargs):
+        # Part way through writing the new columns, look from another store
+        # and then fail as if the process had died
+        if str(path).endswith('low.bin') and 'w' in mode:
+            bars = reader.read('TEST.NS')
+            assert_aligned(bars)
+            seen.append(len(bars['date']))
+            raise OSError("disk full")
+        return real_open(path, mode, *args, **kwargs)
+
+    monkeypatch.setattr(price_history, 'open', interrupted_open, raising=False)
+    with pytest.raises(OSError):
+        writer.prepend('TEST.NS', make_bars('2024-01-01', 9))
+    monkeypatch.undo()
+
+    assert seen == [5]
+    after = reader.read('TEST.NS')
+    for column, values in before.items():
+        np.testing.assert_array_equal(after[column], values)
+
+    # The next prepend completes and clears the abandoned generation
+    assert writer.prepend('TEST.NS', make_bars('2024-01-01', 9)) == 9
+    bars = reader.read('TEST.NS')
+    assert len(bars['date']) == 14
+    assert_aligned(bars)
+    assert len([name for name in os.listdir(writer._dir('TEST.NS')) if name.startswith('gen-')]) == 1
+
+
+def test_reads_stores_written_before_generations(tmp_path):
+    # Column files directly in the symbol directory, as older versions wrote them
+    store = HistoryStore(str(tmp_path))
+    bars = make_bars('2024-01-10', 5)
+    os.makedirs(store._dir('TEST.NS'))
+    for column, dtype in HistoryStore._columns():
+        values = bars.index.values.astype(dtype) if column == 'date' else bars[column].to_numpy(dtype=dtype)
+        values.tofile(os.path.join(store._dir('TEST.NS'), f'{column}.bin'))
+
+    assert len(store.read('TEST.NS')['date']) == 5
+    store.append('TEST.NS', make_bars('2024-01-15', 2))
+    store.prepend('TEST.NS', make_bars('2024-01-01', 9))
+    bars = store.read('TEST.NS')
+    assert len(bars['date']) == 16
+    assert_aligned(bars)
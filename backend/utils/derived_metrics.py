@@ -0,0 +1,187 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Flow rows summed over the latest four quarters for trailing-twelve-month figures
+TTM_FIELDS = ['Total Revenue', 'Gross Profit', 'Operating Income', 'EBITDA', 'Net Income', 'Basic EPS']
+
+# Margin -> numerator row; every margin is taken over Total Revenue
+MARGINS = OrderedDict([
+    ('Gross Margin', 'Gross Profit'),
+    ('Operating Margin', 'Operating Income'),
+    ('EBITDA Margin', 'EBITDA'),
+    ('Net Margin', 'Net Income'),
+])
+
+
+def _latest_first(df):
+    """Statement columns ordered latest period first (Yahoo's usual order)"""
+    if df is None or df.empty:
+        return None
+    return df.sort_index(axis=1, ascending=False)
+
+
+def _rows(df, labels, columns=None):
+    """Numeric matrix of the given rows (NaN where a row or cell is missing), aligned to columns"""
+    rows = df.reindex(index=labels, columns=columns).apply(pd.to_numeric, errors='coerce')
+    return rows.astype(float)
+
+
+def _ratio(numerator, denominator):
+    return numerator / denominator.where(denominator != 0)
+
+
+def _growth(rows, lag):
+    """Change against the period `lag` columns later (i.e. older), relative to its absolute value"""
+    previous = rows.shift(-lag, axis=1)
+    return (rows - previous) / previous.abs().where(previous != 0)
+
+
+def _net_debt(balance, columns):
+    """Net Debt as reported, or Total Debt less cash where Yahoo leaves it out"""
+    rows = _rows(balance, ['Net Debt', 'Total Debt', 'Cash And Cash Equivalents'], columns)
+    return rows.loc['Net Debt'].fillna(rows.loc['Total Debt'] - rows.loc['Cash And Cash Equivalents'])
+
+
+def _margins(rows):
+    revenue = rows.loc['Total Revenue']
+    return pd.DataFrame(OrderedDict(
+        (name, _ratio(rows.loc[field], revenue)) for name, field in MARGINS.items()
+    )).T
+
+
+def annual_metrics(income, balance=None, cash_flow=None):
+    """
+    Margins, year-over-year growth and leverage for every annual period
+
+    Args:
+        income (pd.DataFrame): Annual income statement (fields x periods)
+        balance (pd.DataFrame): Annual balance sheet, aligned on the income periods
+        cash_flow (pd.DataFrame): Annual cash flow statement, aligned likewise
+
+    Returns:
+        pd.DataFrame: Metrics as rows, periods (latest first) as columns
+    """
+    income = _latest_first(income)
+    if income is None:
+        return pd.DataFrame()
+    columns = income.columns
+    rows = _rows(income, ['Total Revenue', 'Gross Profit', 'Operating Income', 'EBITDA', 'Net Income', 'Diluted EPS'])
+    metrics = _margins(rows)
+
+    growth = _growth(rows.loc[['Total Revenue', 'EBITDA', 'Net Income', 'Diluted EPS']], 1)
+    growth.index = ['Revenue Growth', 'EBITDA Growth', 'Net Income Growth', 'EPS Growth']
+    frames = [metrics, growth]
+
+    if balance is not None and not balance.empty:
+        net_debt = _net_debt(balance, columns)
+        leverage = _rows(balance, ['Total Debt', 'Stockholders Equity'], columns)
+        frames.append(pd.DataFrame(OrderedDict([
+            ('Net Debt', net_debt),
+            ('Debt To Equity', _ratio(leverage.loc['Total Debt'], leverage.loc['Stockholders Equity'])),
+            ('Net Debt To EBITDA', _ratio(net_debt, rows.loc['EBITDA'])),
+        ])).T)
+    if cash_flow is not None and not cash_flow.empty:
+        free_cash_flow = _rows(cash_flow, ['Free Cash Flow'], columns).loc['Free Cash Flow']
+        frames.append(pd.DataFrame(OrderedDict([
+            ('Free Cash Flow', free_cash_flow),
+            ('FCF Margin', _ratio(free_cash_flow, rows.loc['Total Revenue'])),
+        ])).T)
+    return pd.concat(frames)
+
+
+def quarterly_metrics(quarterly):
+    """
+    Margins plus quarter-over-quarter and year-over-year growth per quarter
+
+    Returns:
+        pd.DataFrame: Metrics as rows, quarters (latest first) as columns
+    """
+    quarterly = _latest_first(quarterly)
+    if quarterly is None:
+        return pd.DataFrame()
+    rows = _rows(quarterly, ['Total Revenue', 'Gross Profit', 'Operating Income', 'EBITDA', 'Net Income'])
+    flows = rows.loc[['Total Revenue', 'EBITDA', 'Net Income']]
+    qoq = _growth(flows, 1)
+    qoq.index = ['Revenue Growth QoQ', 'EBITDA Growth QoQ', 'Net Income Growth QoQ']
+    yoy = _growth(flows, 4)
+    yoy.index = ['Revenue Growth YoY', 'EBITDA Growth YoY', 'Net Income Growth YoY']
+    return pd.concat([_margins(rows), qoq, yoy])
+
+
+def ttm_metrics(quarterly, balance=None):
+    """
+    Trailing-twelve-month sums of the latest four quarters, with TTM margins
+    and net debt (latest balance sheet) over TTM EBITDA. A figure is only
+    reported when all four quarters have it.
+
+    Returns:
+        pd.DataFrame: One column labelled with the latest quarter end, or an
+            empty frame when fewer than four quarters are available
+    """
+    quarterly = _latest_first(quarterly)
+    if quarterly is None or quarterly.shape[1] < 4:
+        return pd.DataFrame()
+    latest = quarterly.columns[:4]
+    ttm = _rows(quarterly, TTM_FIELDS, latest).sum(axis=1, min_count=4)
+    rows = ttm.to_frame(latest[0])
+    frames = [rows, _margins(rows)]
+
+    balance = _latest_first(balance)
+    if balance is not None:
+        net_debt = _net_debt(balance, balance.columns[:1]).iloc[0]
+        ebitda = ttm['EBITDA']
+        frames.append(pd.DataFrame(
+            {latest[0]: [net_debt, net_debt / ebitda if ebitda else np.nan]},
+            index=['Net Debt', 'Net Debt To EBITDA'],
+        ))
+    return pd.concat(frames)
+
+
+def period_signature(*statements):
+    """
+    Identify which periods a set of statements covers, so metrics are only
+    recomputed once a new period arrives
+    """
+    return tuple(
+        None if df is None or df.empty else (df.shape, str(df.columns.max()))
+        for df in statements
+    )
+
+
+class MetricsMemo:
+    """
+    Derived metrics memoized per symbol and statement periods. Each symbol
+    keeps only the result for its latest periods; the least recently used
+    symbols are dropped beyond max_entries.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # symbol -> (signature, metrics)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.computed = 0
+
+    def get_or_compute(self, symbol, signature, compute):
+        key = symbol.upper()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        metrics = compute()
+        with self._lock:
+            self._entries[key] = (signature, metrics)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.computed += 1
+        return metrics
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,304 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by TTLCache.get when there is no fresh entry (None is a valid payload)
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe, size-bounded LRU cache keyed by (symbol, dataset) where every
+    dataset has its own time-to-live. When cache_dir is given, entries are also
+    pickled to disk so a restarted process starts warm.
+
+    The disk tier is bounded by max_disk_bytes. Each file's mtime holds its
+    expiry and its atime its last use, so a sweep (at most every
+    sweep_interval seconds, shared by every process using the directory)
+    can delete expired files and then the least recently used ones without
+    unpickling anything. Expired files are also deleted when read.
+
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, ttls, default_ttl=60, max_entries=1024, cache_dir=None,
+                 max_disk_bytes=256 * 1024 * 1024, sweep_interval=60):
+        self.ttls = dict(ttls)
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.sweep_interval = sweep_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def ttl_for(self, dataset):
+        return self.ttls.get(dataset, self.default_ttl)
+
+    def get(self, symbol, dataset):
+        """
+        Look up a cached value
+
+        Returns:
+            The cached value, or MISSING if absent or expired
+        """
+        key = (symbol.upper(), dataset)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is not None and entry[0] > now:
+                self._store(key, entry)
+                self.disk_hits += 1
+                return entry[1]
+            self.misses += 1
+        return MISSING
+
+    def expires_in(self, symbol, dataset):
+        """
+        Seconds until the in-memory entry expires (negative once it has),
+        or None when there is none. Doesn't count as a hit or miss.
+        """
+        with self._lock:
+            entry = self._entries.get((symbol.upper(), dataset))
+        return entry[0] - time.time() if entry is not None else None
+
+    def set(self, symbol, dataset, value, min_ttl=None):
+        """
+        Cache a value for its dataset's TTL, or for min_ttl seconds when that
+        is longer (e.g. prefetched entries that must outlive a traffic spike).
+        Datasets whose TTL is 0 are never cached.
+        """
+        ttl = self.ttl_for(dataset)
+        if ttl <= 0:
+            return
+        ttl = max(ttl, min_ttl or 0)
+        key = (symbol.upper(), dataset)
+        entry = (time.time() + ttl, value)
+        with self._lock:
+            self._store(key, entry)
+        self._write_disk(key, entry)
+
+    def clear(self, disk=False):
+        """Drop every in-memory entry, and the disk tier's files too when disk is True"""
+        with self._lock:
+            self._entries.clear()
+        if disk and self.cache_dir:
+            for entry in self._disk_files():
+                self._unlink(entry.path)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_evictions': self.disk_evictions,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 4) if lookups else None,
+            }
+
+    def _store(self, key, entry):
+        # Caller holds self._lock
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(f"{key[0]}|{key[1]}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.pkl")
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Ignoring unreadable cache file {path}: {str(e)}", file=sys.stderr)
+            self._unlink(path)
+            return None
+        now = time.time()
+        if entry[0] <= now:
+            self._unlink(path)
+            return None
+        # Record the use in atime (explicitly; many mounts don't update it)
+        self._touch(path, now, entry[0])
+        return entry
+
+    def _write_disk(self, key, entry):
+        if not self.cache_dir:
+            return
+        try:
+            # Write to a temp file first so concurrent readers never see a partial pickle
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self._touch(tmp_path, time.time(), entry[0])
+            os.replace(tmp_path, self._disk_path(key))
+        except Exception as e:
+            print(f"Failed to write cache entry for {key[0]}/{key[1]}: {str(e)}", file=sys.stderr)
+            return
+        self._maybe_sweep()
+
+    @staticmethod
+    def _touch(path, last_used, expires_at):
+        try:
+            os.utime(path, (last_used, expires_at))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Failed to remove cache file {path}: {str(e)}", file=sys.stderr)
+
+    def _disk_files(self):
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                return [entry for entry in entries if entry.name.endswith(('.pkl', '.tmp'))]
+        except FileNotFoundError:
+            return []
+
+    def _maybe_sweep(self):
+        # The marker's mtime records the last sweep by any process
+        marker = os.path.join(self.cache_dir, '.last_sweep')
+        now = time.time()
+        try:
+            if now - os.stat(marker).st_mtime < self.sweep_interval:
+                return
+        except FileNotFoundError:
+            pass
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            with open(marker, 'a'):
+                pass
+            os.utime(marker, (now, now))
+            self.sweep(now)
+        except OSError as e:
+            print(f"Failed to sweep cache directory {self.cache_dir}: {str(e)}", file=sys.stderr)
+        finally:
+            self._sweep_lock.release()
+
+    def sweep(self, now=None):
+        """
+        Delete expired disk entries (and temp files abandoned by crashed
+        writers), then the least recently used ones until the directory is
+        under max_disk_bytes
+
+        Returns:
+            int: Number of files deleted
+        """
+        if not self.cache_dir:
+            return 0
+        now = now or time.time()
+        removed = 0
+        live = []
+        for entry in self._disk_files():
+            try:
+                info = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith('.tmp'):
+                # Writers stamp a finished temp file with its expiry, so only
+                # look at how long ago a temp file was created
+                stale = now - info.st_ctime > 3600
+            else:
+                stale = info.st_mtime <= now
+            if stale:
+                self._unlink(entry.path)
+                removed += 1
+            elif entry.name.endswith('.pkl'):
+                live.append((info.st_atime, info.st_size, entry.path))
+        total = sum(size for _, size, _ in live)
+        if self.max_disk_bytes is not None and total > self.max_disk_bytes:
+            for _, size, path in sorted(live):
+                if total <= self.max_disk_bytes:
+                    break
+                self._unlink(path)
+                total -= size
+                removed += 1
+                with self._lock:
+                    self.disk_evictions += 1
+        return removed
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls that share a key into one execution: the first
+    caller runs the function and every caller that arrives while it is in
+    flight waits for and receives the same result (or exception).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
@@ -1,7 +1,104 @@
 const { spawn } = require("child_process");
 const path = require("path");
+const readline = require("readline");
+
+// Long-lived extractor process (`yfinanceextractor.py --serve`) used when
+// YFINANCE_DAEMON=true, so each request skips the Python cold start.
+let extractorDaemon = null;
+
+// A request the daemon doesn't answer within this many ms is rejected
+const DAEMON_REQUEST_TIMEOUT_MS =
+  parseInt(process.env.YFINANCE_DAEMON_TIMEOUT_MS, 10) || 30000;
+
+function getExtractorDaemon() {
+  if (extractorDaemon) return extractorDaemon;
+
+  const pythonScript = path.join(__dirname, "yfinanceextractor.py");
+  const pythonCommand = process.platform === "win32" ? "python" : "python3";
+  const pythonProcess = spawn(pythonCommand, [pythonScript, "--serve"], {
+    env: {
+      ...process.env,
+      PYTHONPATH: process.env.PYTHONPATH || "",
+      PATH: process.env.PATH || "",
+    },
+    shell: process.env.NODE_ENV === "production",
+  });
+
+  const pending = new Map();
+  let nextId = 1;
+
+  // Responses arrive in completion order, one JSON object per line
+  readline
+    .createInterface({ input: pythonProcess.stdout })
+    .on("line", (line) => {
+      let message;
+      try {
+        message = JSON.parse(line);
+      } catch (e) {
+        console.error("Failed to parse extractor daemon output:", line);
+        return;
+      }
+      const request = pending.get(message.id);
+      if (!request) return;
+      pending.delete(message.id);
+      clearTimeout(request.timer);
+      if (message.error) request.reject(new Error(message.error));
+      else request.resolve(message.result);
+    });
+
+  pythonProcess.stderr.on("data", (chunk) => {
+    console.error("Python stderr:", chunk.toString());
+  });
+
+  let daemon = null;
+  const failPending = (err) => {
+    for (const request of pending.values()) {
+      clearTimeout(request.timer);
+      request.reject(err);
+    }
+    pending.clear();
+    // The next request starts a fresh daemon
+    if (extractorDaemon === daemon) extractorDaemon = null;
+  };
+  pythonProcess.on("error", (err) => {
+    failPending(new Error(`Failed to start Python process: ${err.message}`));
+  });
+  pythonProcess.on("close", (code) => {
+    failPending(new Error(`Python extractor daemon exited with code ${code}`));
+  });
+  // Writing to a daemon that has died emits EPIPE here; unhandled, it would
+  // crash the server
+  pythonProcess.stdin.on("error", (err) => {
+    failPending(new Error(`Python extractor daemon is unavailable: ${err.message}`));
+    pythonProcess.kill();
+  });
+
+  daemon = {
+    request(command, symbol) {
+      return new Promise((resolve, reject) => {
+        const id = nextId++;
+        const timer = setTimeout(() => {
+          pending.delete(id);
+          reject(
+            new Error(
+              `Python extractor daemon did not answer ${command} for ${symbol} within ${DAEMON_REQUEST_TIMEOUT_MS} ms`
+            )
+          );
+        }, DAEMON_REQUEST_TIMEOUT_MS);
+        pending.set(id, { resolve, reject, timer });
+        pythonProcess.stdin.write(JSON.stringify({ id, command, symbol }) + "\n");
+      });
+    },
+  };
+  extractorDaemon = daemon;
+  return extractorDaemon;
+}
 
 async function getLatestPriceFromYFinance(symbol) {
+  if (process.env.YFINANCE_DAEMON === "true") {
+    return getExtractorDaemon().request("price", symbol);
+  }
+
   return new Promise((resolve, reject) => {
     const pythonScript = path.join(__dirname, "yfinanceextractor.py");
 
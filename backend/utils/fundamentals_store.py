@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS statement_values (
+    symbol TEXT NOT NULL,
+    statement TEXT NOT NULL,
+    period TEXT NOT NULL,
+    field TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (symbol, statement, period, field)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS statement_checks (
+    symbol TEXT NOT NULL,
+    statement TEXT NOT NULL,
+    checked_at REAL NOT NULL,
+    PRIMARY KEY (symbol, statement)
+) WITHOUT ROWID;
+"""
+
+
+class FundamentalsStore:
+    """
+    Local SQLite store of financial statements with one row per
+    (symbol, statement, period, field). Periods are only ever appended:
+    save() writes the periods newer than the latest one already stored.
+
+    Args:
+        directory (str): Directory holding fundamentals.sqlite3 (created if needed)
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, 'fundamentals.sqlite3')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+
+    def latest_period(self, symbol, statement):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT MAX(period) FROM statement_values WHERE symbol = ? AND statement = ?',
+                (symbol.upper(), statement),
+            ).fetchone()
+        return pd.Timestamp(row[0]) if row and row[0] else None
+
+    def last_checked(self, symbol, statement):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT checked_at FROM statement_checks WHERE symbol = ? AND statement = ?',
+                (symbol.upper(), statement),
+            ).fetchone()
+        return row[0] if row else None
+
+    def mark_checked(self, symbol, statement, checked_at=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO statement_checks (symbol, statement, checked_at) VALUES (?, ?, ?)',
+                (symbol.upper(), statement, checked_at or time.time()),
+            )
+
+    def load(self, symbol, statement):
+        """
+        Rebuild a stored statement in yfinance's layout
+
+        Returns:
+            pd.DataFrame: Fields as rows (in their original order), periods as
+                Timestamp columns with the latest first; None if nothing is stored
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT field, period, value, position FROM statement_values '
+                'WHERE symbol = ? AND statement = ?',
+                (symbol.upper(), statement),
+            ).fetchall()
+        if not rows:
+            return None
+
+        long = pd.DataFrame(rows, columns=['field', 'period', 'value', 'position'])
+        # Newer periods may add fields; keep the order each field was first seen in
+        order = long.groupby('field', sort=False)['position'].min().sort_values(kind='stable').index
+        df = long.pivot(index='field', columns='period', values='value').reindex(order)
+        df.columns = pd.to_datetime(df.columns)
+        df = df[sorted(df.columns, reverse=True)]
+        df.index.name = None
+        df.columns.name = None
+        return df
+
+    def save(self, symbol, statement, df):
+        """
+        Append the periods of df that are newer than the latest stored period
+
+        Args:
+            df (pd.DataFrame): Statement as returned by yfinance (fields as
+                rows, period Timestamps as columns)
+
+        Returns:
+            int: Number of (period, field) values written
+        """
+        latest = self.latest_period(symbol, statement)
+        periods = [col for col in df.columns if latest is None or pd.Timestamp(col) > latest]
+        if not periods:
+            return 0
+
+        block = df[periods].apply(pd.to_numeric, errors='coerce')
+        rows = [
+            (symbol.upper(), statement, pd.Timestamp(period).strftime('%Y-%m-%d'), str(field), position,
+             None if pd.isna(value) else float(value))
+            for period in periods
+            for position, (field, value) in enumerate(block[period].items())
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO statement_values (symbol, statement, period, field, position, value) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                rows,
+            )
+        return len(rows)
@@ -0,0 +1,194 @@
+import json
+import sys
+import threading
+import time
+
+from extractor_cache import SingleFlight
+
+EXCHANGERATE_API_URL = "https://v6.exchangerate-api.com/v6/3f2f57927a3c29e06bee862d/latest/{base}"
+
+
+class ExchangeRateApiProvider:
+    """
+    Latest rates from exchangerate-api.com
+
+    Args:
+        get_session (callable): Returns the requests-compatible session used
+            for the HTTP call (so the session is only built when needed)
+        url (str): Endpoint template with a {base} placeholder
+        timeout (float): Request timeout in seconds
+    """
+
+    name = 'exchangerate-api'
+
+    def __init__(self, get_session, url=EXCHANGERATE_API_URL, timeout=10):
+        self.get_session = get_session
+        self.url = url
+        self.timeout = timeout
+
+    def get_rates(self, base):
+        response = self.get_session().get(self.url.format(base=base), timeout=self.timeout)
+        response.raise_for_status()
+
+        data = response.json()
+        if data.get('result') != 'success':
+            raise ValueError(f"exchange rate API returned {data.get('result')!r}")
+        rates = data.get('conversion_rates') or {}
+        # Only log to stderr to avoid interfering with JSON output
+        print(f"Fetched {base} exchange rates ({len(rates)} currencies)", file=sys.stderr)
+        return {currency: float(rate) for currency, rate in rates.items()}
+
+
+class StaticRateProvider:
+    """
+    Fixed rate table, for tests and offline environments
+
+    Args:
+        rates (dict): {base: {currency: rate}}, e.g. {'USD': {'INR': 83.2}}.
+            Inverse pairs are derived when only one direction is given.
+    """
+
+    name = 'static'
+
+    def __init__(self, rates):
+        self.rates = {base.upper(): {c.upper(): float(r) for c, r in table.items()} for base, table in rates.items()}
+
+    def get_rates(self, base):
+        base = base.upper()
+        rates = dict(self.rates.get(base, {}))
+        for other_base, table in self.rates.items():
+            if base in table and other_base not in rates and table[base]:
+                rates[other_base] = 1 / table[base]
+        if not rates:
+            raise KeyError(f"No exchange rates configured for {base}")
+        return rates
+
+
+class FileRateProvider(StaticRateProvider):
+    """
+    Rate table read from a JSON file, re-read on every refresh so it can be
+    updated in place. Accepts either {base: {currency: rate}} or a saved
+    exchangerate-api.com response ({"base_code": ..., "conversion_rates": {...}}).
+    """
+
+    name = 'file'
+
+    def __init__(self, path):
+        self.path = path
+        super().__init__({})
+
+    def get_rates(self, base):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if 'conversion_rates' in data:
+            data = {data.get('base_code', 'USD'): data['conversion_rates']}
+        self.rates = {b.upper(): {c.upper(): float(r) for c, r in table.items()} for b, table in data.items()}
+        return super().get_rates(base)
+
+
+def make_fx_provider(spec, get_session):
+    """
+    Build a provider from a spec string:
+        'exchangerate-api'                     (default, live HTTP)
+        'file:/path/to/rates.json'
+        'static:USD/INR=83.2,EUR/INR=90.1'
+    """
+    kind, _, argument = (spec or 'exchangerate-api').partition(':')
+    if kind == 'exchangerate-api':
+        return ExchangeRateApiProvider(get_session)
+    if kind == 'file':
+        return FileRateProvider(argument)
+    if kind == 'static':
+        rates = {}
+        for item in filter(None, (part.strip() for part in argument.split(','))):
+            pair, _, rate = item.partition('=')
+            base, _, currency = pair.partition('/')
+            rates.setdefault(base.strip().upper(), {})[currency.strip().upper()] = float(rate)
+        return StaticRateProvider(rates)
+    raise ValueError(f"Unknown FX provider: {spec}")
+
+
+class FxRateCache:
+    """
+    Caches rate tables per base currency for `ttl` seconds.
+
+    Once an entry is past `refresh_ahead` of its TTL it is refreshed on a
+    background thread while callers keep getting the cached rate. If a refresh
+    fails, the last known rate is served and flagged as stale; a failed
+    synchronous refresh is not retried for `retry_after` seconds so a slow FX
+    host can't add its timeout to every call. Concurrent callers that find a
+    base currency missing or expired share one provider call.
+    """
+
+    def __init__(self, provider, ttl=3600, refresh_ahead=0.8, retry_after=60):
+        self.provider = provider
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.retry_after = retry_after
+        self._tables = {}       # base -> (fetched_at, rates)
+        self._failed_at = {}    # base -> time of the last failed refresh
+        self._refreshing = set()
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+
+    def get_rate(self, from_currency, to_currency):
+        """
+        Returns:
+            tuple: (rate or None, details) where details holds 'stale',
+                'fetched_at' and 'provider'
+        """
+        from_currency, to_currency = from_currency.upper(), to_currency.upper()
+        if from_currency == to_currency:
+            return 1.0, {'stale': False, 'fetched_at': None, 'provider': None}
+
+        now = time.time()
+        with self._lock:
+            entry = self._tables.get(from_currency)
+            recently_failed = now - self._failed_at.get(from_currency, 0) < self.retry_after
+
+        if entry is None or now - entry[0] >= self.ttl:
+            if not recently_failed:
+                # One table serves every pair with this base, so concurrent
+                # callers share the refresh per base currency
+                entry = self._flights.do(from_currency, self._refresh, from_currency) or entry
+        elif now - entry[0] >= self.ttl * self.refresh_ahead and not recently_failed:
+            self._refresh_in_background(from_currency)
+
+        if entry is None:
+            return None, {'stale': True, 'fetched_at': None, 'provider': self.provider.name}
+        fetched_at, rates = entry
+        details = {
+            'stale': time.time() - fetched_at >= self.ttl,
+            'fetched_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(fetched_at)),
+            'provider': self.provider.name,
+        }
+        return rates.get(to_currency), details
+
+    def _refresh(self, base):
+        try:
+            rates = self.provider.get_rates(base)
+        except Exception as e:
+            print(f"Error fetching {base} exchange rates: {str(e)}", file=sys.stderr)
+            with self._lock:
+                self._failed_at[base] = time.time()
+            return None
+        entry = (time.time(), rates)
+        with self._lock:
+            self._tables[base] = entry
+            self._failed_at.pop(base, None)
+        return entry
+
+    def _refresh_in_background(self, base):
+        with self._lock:
+            if base in self._refreshing:
+                return
+            self._refreshing.add(base)
+
+        def run():
+            try:
+                self._flights.do(base, self._refresh, base)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(base)
+
+        threading.Thread(target=run, name=f'fx-refresh-{base}', daemon=True).start()
@@ -0,0 +1,135 @@
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+try:
+    from curl_cffi import requests as curl_requests
+except ImportError:  # yfinance falls back to plain requests without curl_cffi
+    curl_requests = None
+
+# Responses worth retrying: throttling and transient server-side failures
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+_TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout)
+if curl_requests is not None:
+    _TRANSIENT_ERRORS += (curl_requests.exceptions.ConnectionError, curl_requests.exceptions.Timeout)
+
+
+class TokenBucket:
+    """
+    Client-side rate limiter: allows `rate` requests per second on average
+    with bursts of up to `capacity`. acquire() blocks until a token is free.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _ResilientSessionMixin:
+    """
+    Adds per-host token-bucket throttling and retries with exponential
+    backoff and full jitter (honouring Retry-After) on 429/5xx responses and
+    connection errors to a requests-compatible Session.
+    """
+
+    def _configure(self, rate, burst, max_retries, backoff, backoff_max):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self._limiters = {}
+        self._limiters_lock = threading.Lock()
+        self.retries = 0
+
+    def _limiter(self, url):
+        host = urlsplit(url).hostname or ''
+        with self._limiters_lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = TokenBucket(self.rate, self.burst)
+            return limiter
+
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response is not None and response.headers.get('Retry-After')
+        if retry_after and str(retry_after).isdigit():
+            return min(self.backoff_max, float(retry_after))
+        return random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+
+    def request(self, method, url, *args, **kwargs):
+        limiter = self._limiter(url)
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except _TRANSIENT_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+                print(f"Retrying {method} {urlsplit(url).hostname} in {delay:.2f}s after error: {str(e)}", file=sys.stderr)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+                delay = self._retry_delay(attempt, response)
+                print(f"Retrying {method} {urlsplit(url).hostname} in {delay:.2f}s after HTTP {response.status_code}", file=sys.stderr)
+                response.close()
+            self.retries += 1
+            time.sleep(delay)
+
+
+class ResilientRequestsSession(_ResilientSessionMixin, requests.Session):
+    pass
+
+
+if curl_requests is not None:
+    class ResilientCurlSession(_ResilientSessionMixin, curl_requests.Session):
+        pass
+
+
+def make_session(rate=10, burst=20, max_retries=3, backoff=0.5, backoff_max=30, pool_size=32):
+    """
+    Build the shared keep-alive session used for Yahoo and FX calls
+
+    A curl_cffi session (which yfinance prefers, impersonating a browser) is
+    used when curl_cffi is installed; otherwise a requests session with a
+    bounded connection pool.
+
+    Args:
+        rate (float): Average requests per second allowed per host (0 = unlimited)
+        burst (int): Requests allowed back to back before throttling starts
+        max_retries (int): Retries on 429/5xx responses and connection errors
+        backoff (float): Base delay in seconds, doubled on every retry
+        backoff_max (float): Cap on a single retry delay
+        pool_size (int): Maximum pooled connections per host (requests backend)
+    """
+    if curl_requests is not None:
+        session = ResilientCurlSession(impersonate="chrome")
+    else:
+        session = ResilientRequestsSession()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+    session._configure(rate, burst, max_retries, backoff, backoff_max)
+    return session
@@ -0,0 +1,221 @@
+import contextvars
+import functools
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Opt-in output of per-stage timings (YFINANCE_TIMINGS or --timings):
+#   'json'    add a "timings" block to each JSON object response
+#   'stderr'  print metrics lines to stderr
+#   'metrics' only aggregate into the Prometheus dump (server mode)
+MODES = ('json', 'stderr', 'metrics')
+
+_mode = None
+_current = contextvars.ContextVar('extractor_trace', default=None)
+
+
+def configure(mode):
+    global _mode
+    if mode and mode not in MODES:
+        raise ValueError(f"Unknown timings mode: {mode} (expected one of {', '.join(MODES)})")
+    _mode = mode or None
+
+
+def enabled():
+    return _mode is not None
+
+
+class Trace:
+    """
+    Timings collected for one command call: wall time per pipeline stage
+    (summed when a stage runs several times or on several threads), event
+    counts such as upstream calls, and payload sizes
+    """
+
+    def __init__(self, command, symbol=None):
+        self.command = command
+        self.symbol = symbol
+        self.stages = OrderedDict()
+        self.counts = OrderedDict()
+        self.sizes = OrderedDict()
+        self.total = None
+        self._lock = threading.Lock()
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_count(self, name, n=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def add_size(self, name, n):
+        with self._lock:
+            self.sizes[name] = self.sizes.get(name, 0) + n
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'total_ms': round(self.total * 1000, 3) if self.total is not None else None,
+                'stages_ms': {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+                'counts': dict(self.counts),
+                'sizes': dict(self.sizes),
+            }
+
+    def metric_lines(self):
+        labels = f'command="{self.command}",symbol="{self.symbol or ""}"'
+        lines = [f'extractor_request_seconds{{{labels}}} {self.total:.6f}']
+        with self._lock:
+            lines += [f'extractor_stage_seconds{{{labels},stage="{n}"}} {s:.6f}' for n, s in self.stages.items()]
+            lines += [f'extractor_events{{{labels},event="{n}"}} {c}' for n, c in self.counts.items()]
+            lines += [f'extractor_bytes{{{labels},kind="{n}"}} {b}' for n, b in self.sizes.items()]
+        return lines
+
+
+class _Stage:
+    __slots__ = ('trace', 'name', 'started')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.trace.add_time(self.name, time.perf_counter() - self.started)
+
+
+class _NullStage:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name):
+    """Context manager timing one pipeline stage of the current trace (no-op when not tracing)"""
+    trace = _current.get()
+    return _NULL_STAGE if trace is None else _Stage(trace, name)
+
+
+def count(name, n=1):
+    trace = _current.get()
+    if trace is not None:
+        trace.add_count(name, n)
+
+
+def record_size(name, n):
+    trace = _current.get()
+    if trace is not None:
+        trace.add_size(name, n)
+
+
+def bind(func):
+    """
+    Make func run in a copy of the current context, so work submitted to a
+    thread pool is attributed to the caller's trace. Bind once per submit:
+    a copied context can't be entered by two threads at once.
+    """
+    if _current.get() is None:
+        return func
+    return functools.partial(contextvars.copy_context().run, func)
+
+
+class MetricsRegistry:
+    """Cumulative per-command counters, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._values = OrderedDict()  # (metric, labels) -> value
+        self._lock = threading.Lock()
+
+    def _add(self, metric, labels, value):
+        key = (metric, labels)
+        self._values[key] = self._values.get(key, 0) + value
+
+    def observe(self, trace):
+        command = f'command="{trace.command}"'
+        with self._lock:
+            self._add('extractor_requests_total', command, 1)
+            self._add('extractor_request_seconds_sum', command, trace.total)
+            for name, seconds in trace.stages.items():
+                self._add('extractor_stage_seconds_sum', f'{command},stage="{name}"', seconds)
+            for name, n in trace.counts.items():
+                self._add('extractor_events_total', f'{command},event="{name}"', n)
+            for name, n in trace.sizes.items():
+                self._add('extractor_bytes_total', f'{command},kind="{name}"', n)
+
+    def render(self, gauges=None):
+        """
+        Args:
+            gauges (dict): Extra point-in-time values, name -> number
+
+        Returns:
+            str: Prometheus exposition text
+        """
+        # Samples of one metric must be contiguous, after its TYPE line
+        grouped = OrderedDict()
+        with self._lock:
+            for (metric, labels), value in self._values.items():
+                grouped.setdefault(metric, []).append((labels, value))
+        lines = []
+        for metric, samples in grouped.items():
+            lines.append(f'# TYPE {metric} counter')
+            for labels, value in samples:
+                lines.append(f'{metric}{{{labels}}} {value}' if isinstance(value, int) else f'{metric}{{{labels}}} {value:.6f}')
+        for name, value in (gauges or {}).items():
+            if value is None:
+                continue
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+def _attach(trace, result):
+    if _mode == 'json' and isinstance(result, str) and result.endswith('}'):
+        block = json.dumps(trace.as_dict())
+        if result.rstrip() == '{}':
+            return '{"timings": %s}' % block
+        # The result is already JSON, so splice the block in rather than re-encoding
+        return result[:-1] + ', "timings": %s}' % block
+    if _mode in ('json', 'stderr'):
+        print('\n'.join(trace.metric_lines()), file=sys.stderr)
+    return result
+
+
+def traced(command):
+    """
+    Decorator starting a trace around a command function when timings are
+    enabled. Calls made while a trace is already active (e.g. nested
+    commands) are recorded in the outer trace.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _mode is None or _current.get() is not None:
+                return func(*args, **kwargs)
+            symbol = args[0] if args and isinstance(args[0], str) else kwargs.get('symbol')
+            trace = Trace(command, symbol)
+            token = _current.set(trace)
+            started = time.perf_counter()
+            result = None
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                trace.total = time.perf_counter() - started
+                _current.reset(token)
+                if isinstance(result, str):
+                    trace.add_size('response_bytes', len(result))
+                metrics.observe(trace)
+            return _attach(trace, result)
+        return wrapper
+    return decorator
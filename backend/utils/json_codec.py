@@ -0,0 +1,100 @@
+import json
+import math
+from datetime import date
+
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def _is_missing(value):
+    # pd.NaT and pd.NA, recognised without importing pandas
+    return type(value).__name__ in ('NaTType', 'NAType')
+
+
+def encode_default(value):
+    """
+    Fallback for values the encoders don't handle themselves: dates and
+    timestamps become 'YYYY-MM-DD', NaT/NA become null, NumPy scalars and
+    arrays become Python numbers and lists, Series/DataFrames become dicts
+    """
+    if _is_missing(value):
+        return None
+    if isinstance(value, date):
+        return value.strftime(DATE_FORMAT)
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if hasattr(value, 'tolist'):
+        # NumPy scalars and arrays (including datetime64 and object arrays)
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class OrjsonEncoder:
+    """
+    orjson-backed encoder. NumPy scalars and arrays are serialized natively,
+    NaN and infinities become null, and datetimes are passed to
+    encode_default so every date is written as 'YYYY-MM-DD'. Objects orjson
+    rejects (e.g. timestamp dict keys) are encoded by StdlibEncoder instead.
+    """
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._dumps = orjson.dumps
+        self._options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(self, obj):
+        try:
+            return self._dumps(obj, default=encode_default, option=self._options).decode('utf-8')
+        except TypeError:
+            return _stdlib_encoder.dumps(obj)
+
+
+class StdlibEncoder:
+    """
+    json-module encoder producing the same output as OrjsonEncoder. The
+    stdlib never hands floats to `default`, so NaN/inf are replaced with
+    null in a walk over the object first.
+    """
+
+    name = 'json'
+
+    def dumps(self, obj):
+        return json.dumps(self._finite(obj), default=encode_default, ensure_ascii=False, separators=(',', ':'))
+
+    def _finite(self, obj):
+        if isinstance(obj, float):
+            return obj if math.isfinite(obj) else None
+        if isinstance(obj, dict):
+            return {key if isinstance(key, (str, int, float, bool)) or key is None else encode_default(key): self._finite(value)
+                    for key, value in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [self._finite(item) for item in obj]
+        if _is_missing(obj) or isinstance(obj, date):
+            return encode_default(obj)
+        if hasattr(obj, 'tolist') or hasattr(obj, 'to_dict'):
+            return self._finite(encode_default(obj))
+        return obj
+
+
+_stdlib_encoder = StdlibEncoder()
+
+
+def make_encoder(spec=None):
+    """
+    Build the response encoder from a spec string:
+        None / 'auto'  orjson when it is installed, otherwise the stdlib
+        'orjson'       orjson (fails if it is not installed)
+        'json'         the stdlib json module
+    """
+    kind = (spec or 'auto').lower()
+    if kind == 'json':
+        return StdlibEncoder()
+    if kind == 'orjson':
+        return OrjsonEncoder()
+    if kind == 'auto':
+        try:
+            return OrjsonEncoder()
+        except ImportError:
+            return StdlibEncoder()
+    raise ValueError(f"Unknown JSON encoder: {spec}")
@@ -0,0 +1,119 @@
+import importlib
+import importlib.abc
+import importlib.util
+import sys
+import threading
+import time
+import types
+
+# Seconds spent importing each lazily loaded module, in load order. Each
+# figure excludes the other lazily loaded modules it imported itself.
+import_timings = {}
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """Wraps a module's real loader to time executing it"""
+
+    def __init__(self, loader, clock):
+        self.loader = loader
+        self.clock = clock
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Hand the module its real loader before any of its code runs
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+        self.clock.run(module.__name__, self.loader.exec_module, module)
+
+
+class _ImportClock(importlib.abc.MetaPathFinder):
+    """
+    Times the first import of watched modules however it is triggered, so a
+    module pulled in indirectly (e.g. pandas by unpickling a cached
+    DataFrame) is attributed correctly rather than showing up as free when
+    its LazyModule is later touched. Nested watched imports are subtracted
+    from the outer one, like the self time of `python -X importtime`.
+    """
+
+    def __init__(self):
+        self.watched = set()
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname not in self.watched or fullname in import_timings or getattr(self._local, 'finding', False):
+            return None
+        # Let the remaining finders locate the module, then wrap its loader
+        self._local.finding = True
+        try:
+            spec = importlib.util.find_spec(fullname)
+        finally:
+            self._local.finding = False
+        if spec is None or spec.loader is None:
+            return None
+        spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    def run(self, name, func, *args):
+        stack = self._local.__dict__.setdefault('nested', [])
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            func(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = stack.pop()
+            import_timings.setdefault(name, elapsed - nested)
+            if stack:
+                stack[-1] += elapsed
+
+
+_clock = _ImportClock()
+sys.meta_path.insert(0, _clock)
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a heavy module that is only imported on first attribute
+    access. After loading, the real module's namespace is copied onto the
+    proxy so later lookups cost the same as on the module itself.
+
+    Args:
+        name (str): Module to import, e.g. 'pandas'
+        on_load (callable): Called with the real module right after import
+    """
+
+    def __init__(self, name, on_load=None):
+        super().__init__(name)
+        self._lazy_on_load = on_load
+        self._lazy_lock = threading.RLock()
+        self._lazy_module = None
+        _clock.watched.add(name)
+
+    @property
+    def is_loaded(self):
+        """Whether the real module has been imported, by this proxy or otherwise"""
+        return self._lazy_module is not None or self.__name__ in sys.modules
+
+    def load(self):
+        with self._lazy_lock:
+            if self._lazy_module is None:
+                module = importlib.import_module(self.__name__)
+                if self._lazy_on_load is not None:
+                    self._lazy_on_load(module)
+                self.__dict__.update(
+                    (key, value) for key, value in module.__dict__.items()
+                    if key not in ('__name__', '__spec__', '__loader__')
+                )
+                self._lazy_module = module
+            return self._lazy_module
+
+    def __getattr__(self, attr):
+        # Only reached for names not copied over yet, i.e. before load() or
+        # for submodules imported after it
+        return getattr(self.load(), attr)
+
+    def __dir__(self):
+        return dir(self.load())
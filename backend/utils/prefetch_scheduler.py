@@ -0,0 +1,182 @@
+import json
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+# (name, lowest, highest) for the five cron fields
+_CRON_FIELDS = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day of month', 1, 31),
+    ('month', 1, 12),
+    ('day of week', 0, 7),
+)
+
+
+def _parse_cron_field(text, name, lowest, highest):
+    values = set()
+    for part in text.split(','):
+        part, _, step = part.partition('/')
+        if part == '*':
+            start, end = lowest, highest
+        elif '-' in part:
+            start, end = (int(v) for v in part.split('-', 1))
+        else:
+            start = end = int(part)
+            if step:
+                end = highest
+        if not lowest <= start <= end <= highest:
+            raise ValueError(f"Cron {name} out of range: {text}")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+
+class CronSchedule:
+    """
+    A five-field cron expression ("minute hour day-of-month month day-of-week",
+    with *, lists, ranges and /steps) optionally followed by an IANA time
+    zone, e.g. "14 9 * * 1-5 Asia/Kolkata". Without a zone, local time is
+    used. As in cron, when both day fields are restricted either may match.
+    """
+
+    def __init__(self, spec):
+        parts = spec.split()
+        if len(parts) not in (5, 6):
+            raise ValueError(f"Invalid schedule: {spec!r} (expected 5 cron fields and an optional time zone)")
+        self.spec = spec
+        try:
+            (self.minutes, self.hours, self.days, self.months, weekdays) = (
+                _parse_cron_field(text, *field) for text, field in zip(parts[:5], _CRON_FIELDS)
+            )
+        except ValueError as e:
+            raise ValueError(f"Invalid schedule {spec!r}: {e}") from None
+        # Cron counts Sunday as 0 or 7; datetime.isoweekday() counts it as 7
+        self.weekdays = {7 if day == 0 else day for day in weekdays}
+        self.any_day = parts[2] == '*'
+        self.any_weekday = parts[4] == '*'
+        if len(parts) == 6:
+            if ZoneInfo is None:
+                raise ValueError("Time zones in schedules need Python 3.9+")
+            self.tz = ZoneInfo(parts[5])
+        else:
+            self.tz = None
+
+    def _day_matches(self, day):
+        if day.month not in self.months:
+            return False
+        by_date = day.day in self.days
+        by_weekday = day.isoweekday() in self.weekdays
+        if self.any_day or self.any_weekday:
+            return by_date and by_weekday
+        return by_date or by_weekday
+
+    def next_after(self, when):
+        """
+        Returns:
+            datetime: The first matching minute strictly after `when`
+                (an aware datetime), in the schedule's time zone
+        """
+        local = when.astimezone(self.tz).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = local.date()
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                for hour in sorted(self.hours):
+                    for minute in sorted(self.minutes):
+                        candidate = datetime(day.year, day.month, day.day, hour, minute, tzinfo=self.tz)
+                        if self.tz is None:
+                            candidate = candidate.astimezone()
+                        if candidate >= local:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"Schedule {self.spec!r} never fires")
+
+
+class PrefetchScheduler:
+    """
+    Runs warm-ups at cron-scheduled times and, in between, a rolling refresh
+    every hot_interval seconds. Runs never overlap: a run that comes due
+    while another is in progress starts when it finishes.
+
+    Args:
+        warm (callable): warm(reason) runs one scheduled warm-up and returns its report
+        schedules (list): CronSchedule instances
+        refresh_hot (callable): refresh_hot(reason) runs one rolling refresh
+            and returns its report (no rolling refresh when None)
+        hot_interval (float): Seconds between rolling refreshes
+        report (callable): Called with every report, e.g. to log it
+    """
+
+    def __init__(self, warm, schedules, refresh_hot=None, hot_interval=None, report=None, history=20):
+        self.warm = warm
+        self.schedules = list(schedules)
+        self.refresh_hot = refresh_hot
+        self.hot_interval = hot_interval if refresh_hot is not None and hot_interval else None
+        self.report = report
+        self.reports = deque(maxlen=history)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def next_runs(self, now=None):
+        """(due time, reason) for every cron schedule, soonest first"""
+        now = now or datetime.now().astimezone()
+        runs = [(schedule.next_after(now), f'schedule {schedule.spec}') for schedule in self.schedules]
+        return sorted(runs, key=lambda run: run[0])
+
+    def run_now(self, reason='manual'):
+        """Run one scheduled warm-up immediately on the calling thread"""
+        self._run(self.warm, reason)
+
+    def _run(self, job, reason):
+        try:
+            report = job(reason)
+        except Exception as e:
+            report = {'reason': reason, 'error': str(e)}
+        self.reports.append(report)
+        if self.report is not None:
+            self.report(report)
+
+    def run_forever(self):
+        next_hot = time.time() + self.hot_interval if self.hot_interval else None
+        last_due = None
+        while not self._stop.is_set():
+            # Count from the last scheduled run too, so a wait that ends a
+            # moment early can't fire the same minute twice
+            now = datetime.now().astimezone()
+            runs = self.next_runs(max(now, last_due) if last_due is not None else now)
+            due_at, reason = runs[0] if runs else (None, None)
+            wait_until = due_at.timestamp() if due_at is not None else None
+            if next_hot is not None and (wait_until is None or next_hot < wait_until):
+                wait_until, reason = next_hot, 'rolling refresh'
+            if wait_until is None:
+                return
+            if self._stop.wait(max(0.0, wait_until - time.time())):
+                return
+            if reason == 'rolling refresh':
+                self._run(self.refresh_hot, reason)
+                next_hot = time.time() + self.hot_interval
+            else:
+                self._run(self.warm, reason)
+                last_due = due_at
+
+    def start(self):
+        """Run the scheduler on a daemon thread"""
+        self._thread = threading.Thread(target=self.run_forever, name='prefetch-scheduler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def print_report(report, outfile=sys.stderr):
+    """Log one warm-up report as a JSON line"""
+    print(json.dumps(report), file=outfile, flush=True)
@@ -0,0 +1,284 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote as quote_path
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within a process
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+# Bar columns; each is stored as a raw float64 file next to the datetime64[D] dates
+FIELDS = ('open', 'high', 'low', 'close', 'adj_close', 'volume')
+DATE_DTYPE = np.dtype('datetime64[D]')
+VALUE_DTYPE = np.dtype('float64')
+
+# File in a symbol's directory naming its current generation directory
+POINTER_FILE = 'CURRENT'
+
+# yf.download column -> stored column
+DOWNLOAD_COLUMNS = {
+    'Open': 'open',
+    'High': 'high',
+    'Low': 'low',
+    'Close': 'close',
+    'Adj Close': 'adj_close',
+    'Volume': 'volume',
+}
+
+
+def normalize_bars(frame):
+    """
+    Daily bars from yf.download / Ticker.history as a float frame with FIELDS
+    columns and a sorted, tz-naive, day-precision DatetimeIndex
+    """
+    if frame is None or frame.empty:
+        return pd.DataFrame(columns=list(FIELDS), dtype=float)
+    bars = frame.rename(columns=DOWNLOAD_COLUMNS).reindex(columns=list(FIELDS)).astype(float)
+    index = pd.DatetimeIndex(bars.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    bars.index = index.normalize()
+    bars = bars.dropna(how='all')
+    return bars[~bars.index.duplicated(keep='last')].sort_index()
+
+
+class HistoryStore:
+    """
+    Append-only daily bar files, one directory per symbol holding one raw
+    column file per field (`date.bin`, `close.bin`, ...). Reads memory-map
+    the files, so range queries return views into the mapped arrays without
+    copying. Only the last bar may be rewritten (an intraday bar replaced by
+    its final values); earlier history is only ever extended.
+
+    The column files live in a generation directory named by the symbol's
+    `CURRENT` file. Appends extend the current generation; a prepend writes
+    a complete new one and then swaps `CURRENT`, so readers see either the
+    old or the new columns, never a mix. Writes to a symbol hold an
+    exclusive lock on its `.lock` file, so extractor processes sharing the
+    directory never interleave rows, and cached mappings are checked against
+    the current `date.bin` before each read to pick up other processes' writes.
+
+    Args:
+        directory (str): Root directory (created if needed)
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._maps = {}  # symbol -> ((generation, date.bin identity), {column: memmap})
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _dir(self, symbol):
+        return os.path.join(self.directory, quote_path(symbol.upper(), safe=''))
+
+    def _generation(self, symbol):
+        # Stores written before generations existed keep their columns in
+        # the symbol directory itself
+        try:
+            with open(os.path.join(self._dir(symbol), POINTER_FILE), 'r', encoding='utf-8') as f:
+                return os.path.join(self._dir(symbol), f.read().strip())
+        except FileNotFoundError:
+            return self._dir(symbol)
+
+    @staticmethod
+    def _path(generation, column):
+        return os.path.join(generation, f'{column}.bin')
+
+    def _rows(self, generation):
+        # A crash between column writes leaves some files longer; only rows
+        # present in every column count
+        sizes = []
+        for column, dtype in self._columns():
+            try:
+                sizes.append(os.path.getsize(self._path(generation, column)) // dtype.itemsize)
+            except FileNotFoundError:
+                return 0
+        return min(sizes)
+
+    @staticmethod
+    def _columns():
+        return [(field, VALUE_DTYPE) for field in FIELDS] + [('date', DATE_DTYPE)]
+
+    @staticmethod
+    def _replace_file(path, text):
+        # Replace the file whole so unlocked readers never see a partial write
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _writing(self, symbol):
+        """Serialize writers of a symbol across threads and processes"""
+        with self._lock:
+            os.makedirs(self._dir(symbol), exist_ok=True)
+            with open(os.path.join(self._dir(symbol), '.lock'), 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _identity(self, symbol):
+        # Changes whenever rows are appended (date.bin is written last) or a
+        # prepend swaps in a new generation, in this process or another one
+        generation = self._generation(symbol)
+        try:
+            stat = os.stat(self._path(generation, 'date'))
+        except FileNotFoundError:
+            return None
+        return (generation, stat.st_ino, stat.st_size) if stat.st_size else None
+
+    def _mapped(self, symbol):
+        key = symbol.upper()
+        # A prepend in another process may retire the generation between
+        # resolving and mapping it; resolve again then
+        for _ in range(3):
+            identity = self._identity(symbol)
+            if identity is None:
+                return None
+            with self._lock:
+                cached = self._maps.get(key)
+                if cached is not None and cached[0] == identity:
+                    return cached[1]
+            generation = identity[0]
+            rows = self._rows(generation)
+            if rows == 0:
+                continue
+            try:
+                arrays = {
+                    column: np.memmap(self._path(generation, column), dtype=dtype, mode='r', shape=(rows,))
+                    for column, dtype in self._columns()
+                }
+            except FileNotFoundError:
+                continue
+            with self._lock:
+                self._maps[key] = (identity, arrays)
+            return arrays
+        return None
+
+    def read(self, symbol, start=None, end=None):
+        """
+        Bars between start and end (inclusive dates, either may be None)
+
+        Returns:
+            dict: 'date' and FIELDS -> read-only array views into the mapped
+                files, or None when nothing is stored for the symbol
+        """
+        arrays = self._mapped(symbol)
+        if arrays is None:
+            return None
+        dates = arrays['date']
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start).date(), 'D'), 'left'))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end).date(), 'D'), 'right'))
+        return {column: np.asarray(array[lo:hi]) for column, array in arrays.items()}
+
+    def first_date(self, symbol):
+        arrays = self._mapped(symbol)
+        return pd.Timestamp(arrays['date'][0]) if arrays is not None else None
+
+    def last_date(self, symbol):
+        arrays = self._mapped(symbol)
+        return pd.Timestamp(arrays['date'][-1]) if arrays is not None else None
+
+    def append(self, symbol, bars):
+        """
+        Add bars after the latest stored one; a bar for the latest stored
+        date replaces it in place and older bars are ignored
+
+        Returns:
+            int: Number of bars added
+        """
+        bars = normalize_bars(bars)
+        with self._writing(symbol):
+            generation = self._generation(symbol)
+            last = self.last_date(symbol)
+            rows = self._rows(generation)
+            if last is not None:
+                if last in bars.index:
+                    self._write_row(generation, rows - 1, bars.loc[last])
+                bars = bars[bars.index > last]
+            if not bars.empty:
+                for column, dtype in self._columns():
+                    values = bars.index.values.astype(dtype) if column == 'date' else bars[column].to_numpy(dtype=dtype)
+                    # Truncate any partial tail left by an interrupted append first
+                    with open(self._path(generation, column), 'ab') as f:
+                        f.truncate(rows * dtype.itemsize)
+                        f.write(values.tobytes())
+            return len(bars)
+
+    def _write_row(self, generation, position, bar):
+        for column in FIELDS:
+            with open(self._path(generation, column), 'r+b') as f:
+                f.seek(position * VALUE_DTYPE.itemsize)
+                f.write(np.array([bar[column]], dtype=VALUE_DTYPE).tobytes())
+
+    def prepend(self, symbol, bars):
+        """
+        Add bars older than the first stored one. Unlike append this rewrites
+        the columns, into a new generation that replaces the current one in
+        a single step (mapped views of the old files stay valid).
+
+        Returns:
+            int: Number of bars added
+        """
+        bars = normalize_bars(bars)
+        with self._writing(symbol):
+            stored = self.read(symbol)
+            first = self.first_date(symbol)
+            if first is not None:
+                bars = bars[bars.index < first]
+            if bars.empty:
+                return 0
+            generation = tempfile.mkdtemp(dir=self._dir(symbol), prefix='gen-')
+            for column, dtype in self._columns():
+                values = bars.index.values.astype(dtype) if column == 'date' else bars[column].to_numpy(dtype=dtype)
+                if stored is not None:
+                    values = np.concatenate([values, stored[column]])
+                with open(self._path(generation, column), 'wb') as f:
+                    f.write(values.tobytes())
+            self._replace_file(os.path.join(self._dir(symbol), POINTER_FILE), os.path.basename(generation))
+            self._retire_generations(symbol, generation)
+            return len(bars)
+
+    def _retire_generations(self, symbol, current):
+        # Older generations and any left by an interrupted prepend. Processes
+        # still mapping them keep their views (on Windows the removal fails
+        # and is retried by the next prepend).
+        base = self._dir(symbol)
+        for name in os.listdir(base):
+            path = os.path.join(base, name)
+            if name.startswith('gen-') and path != current:
+                shutil.rmtree(path, ignore_errors=True)
+            elif name.endswith('.bin'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def meta(self, symbol):
+        """
+        Returns:
+            dict: 'checked_at' (time of the last upstream check) and
+                'covered_from' (earliest start date fetched), when known
+        """
+        try:
+            with open(os.path.join(self._dir(symbol), 'meta.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def update_meta(self, symbol, **values):
+        with self._writing(symbol):
+            meta = self.meta(symbol)
+            meta.update(values)
+            self._replace_file(os.path.join(self._dir(symbol), 'meta.json'), json.dumps(meta))
@@ -0,0 +1,141 @@
+import os
+import pickle
+import tempfile
+import threading
+from urllib.parse import quote as quote_path
+
+
+class ReplayBackend:
+    """
+    Offline stand-in for Yahoo: serves yf.Ticker datasets and quote rows that
+    were recorded earlier (or generated) as pickles under
+    `directory/<SYMBOL>/<dataset>.pkl`, with quotes stored as dataset 'quote'
+    and daily bars as dataset 'history'.
+    Loaded fixtures are kept in memory so replays measure the extractor, not
+    the disk.
+
+    Args:
+        directory (str): Fixture directory (created if needed)
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._loaded = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, symbol, dataset):
+        return os.path.join(self.directory, quote_path(symbol.upper(), safe=''), f'{dataset}.pkl')
+
+    def _load(self, symbol, dataset):
+        key = (symbol.upper(), dataset)
+        with self._lock:
+            if key in self._loaded:
+                return self._loaded[key]
+        path = self._path(symbol, dataset)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            raise LookupError(f"No recorded {dataset} for {symbol} in {self.directory}") from None
+        with self._lock:
+            self._loaded[key] = value
+        return value
+
+    def fetch(self, symbol, dataset):
+        return self._load(symbol, dataset)
+
+    def fetch_quotes(self, symbols):
+        quotes = {}
+        for symbol in symbols:
+            try:
+                quotes[symbol] = self._load(symbol, 'quote')
+            except LookupError:
+                pass
+        return quotes
+
+    def fetch_history(self, symbols, start=None, end=None):
+        # Imported here so loading the backend doesn't pull in pandas
+        import pandas as pd
+        histories = {}
+        for symbol in symbols:
+            try:
+                bars = self._load(symbol, 'history')
+            except LookupError:
+                continue
+            if start is not None:
+                bars = bars[bars.index >= pd.Timestamp(start)]
+            if end is not None:
+                bars = bars[bars.index < pd.Timestamp(end)]
+            histories[symbol] = bars
+        return histories
+
+    def save(self, symbol, dataset, value):
+        path = self._path(symbol, dataset)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._loaded[(symbol.upper(), dataset)] = value
+
+
+class RecordingBackend(ReplayBackend):
+    """
+    Fetches from the live functions and saves every response as a fixture,
+    to build a replay directory from real data
+
+    Args:
+        directory (str): Fixture directory
+        fetch (callable): Live fetch(symbol, dataset)
+        fetch_quotes (callable): Live fetch_quotes(symbols) -> {symbol: row}
+        fetch_history (callable): Live fetch_history(symbols, start, end) ->
+            {symbol: bars DataFrame}
+    """
+
+    def __init__(self, directory, fetch, fetch_quotes, fetch_history=None):
+        super().__init__(directory)
+        self._live_fetch = fetch
+        self._live_fetch_quotes = fetch_quotes
+        self._live_fetch_history = fetch_history
+
+    def fetch(self, symbol, dataset):
+        value = self._live_fetch(symbol, dataset)
+        self.save(symbol, dataset, value)
+        return value
+
+    def fetch_quotes(self, symbols):
+        quotes = self._live_fetch_quotes(symbols)
+        for symbol, row in quotes.items():
+            self.save(symbol, 'quote', row)
+        return quotes
+
+    def fetch_history(self, symbols, start=None, end=None):
+        histories = self._live_fetch_history(symbols, start, end)
+        for symbol, bars in histories.items():
+            try:
+                recorded = self._load(symbol, 'history')
+            except LookupError:
+                recorded = None
+            # Keep every range recorded so far, so replays can serve any of them
+            merged = bars if recorded is None else bars.combine_first(recorded)
+            self.save(symbol, 'history', merged)
+        return histories
+
+
+def make_backend(spec, fetch, fetch_quotes, fetch_history=None):
+    """
+    Build the upstream backend from a spec string:
+        'yahoo'             (default) returns None: use the live functions
+        'replay:/fixtures'  serve recorded responses only
+        'record:/fixtures'  call Yahoo and record every response
+    """
+    kind, _, argument = (spec or 'yahoo').partition(':')
+    if kind == 'yahoo':
+        return None
+    if kind == 'replay':
+        return ReplayBackend(argument)
+    if kind == 'record':
+        return RecordingBackend(argument, fetch, fetch_quotes, fetch_history)
+    raise ValueError(f"Unknown backend: {spec}")
@@ -0,0 +1,137 @@
+import operator
+import re
+
+import numpy as np
+import pandas as pd
+
+# info fields loaded into a screener snapshot; all but TEXT_FIELDS are numeric
+SNAPSHOT_FIELDS = [
+    'shortName', 'currency', 'industry', 'quoteType', 'fullExchangeName',
+    'currentPrice', 'marketCap', 'beta', 'priceToBook', 'bookValue',
+    'trailingEps', 'forwardEps', 'dividendRate', 'dividendYield', 'payoutRatio',
+    'debtToEquity', 'currentRatio', 'quickRatio', 'totalCash', 'totalDebt',
+    'returnOnAssets', 'returnOnEquity', 'revenueGrowth', 'earningsGrowth',
+    'grossMargins', 'ebitdaMargins', 'operatingMargins',
+    'heldPercentInsiders', 'heldPercentInstitutions',
+    'fiftyTwoWeekLow', 'fiftyTwoWeekHigh', 'fiftyDayAverage', 'twoHundredDayAverage',
+]
+TEXT_FIELDS = frozenset(['shortName', 'currency', 'industry', 'quoteType', 'fullExchangeName'])
+
+OPERATORS = {
+    '>=': operator.ge,
+    '<=': operator.le,
+    '!=': operator.ne,
+    '==': operator.eq,
+    '>': operator.gt,
+    '<': operator.lt,
+}
+_CONDITION = re.compile(r'^\s*([A-Za-z_][A-Za-z0-9_]*)\s*(>=|<=|!=|==|>|<)\s*(.+?)\s*$')
+
+
+def build_snapshot(infos, fields=SNAPSHOT_FIELDS):
+    """
+    Load the info dicts of a universe into one columnar DataFrame
+
+    Args:
+        infos (dict): symbol -> yf.Ticker info dict
+        fields (list): Columns to keep
+
+    Returns:
+        pd.DataFrame: One row per symbol (the index); numeric columns are
+            float with NaN where a symbol lacks the field
+    """
+    snapshot = pd.DataFrame.from_records(
+        [[info.get(field) for field in fields] for info in infos.values()],
+        index=pd.Index(list(infos), name='symbol'),
+        columns=fields,
+    )
+    numeric = [field for field in fields if field not in TEXT_FIELDS]
+    snapshot[numeric] = snapshot[numeric].apply(pd.to_numeric, errors='coerce').astype(float)
+    return snapshot
+
+
+def parse_filters(spec):
+    """
+    Parse filter conditions such as "marketCap>1e10,debtToEquity<50,currency==INR".
+    All conditions must hold; numeric values are compared as numbers, anything
+    else as text.
+
+    Returns:
+        list: (field, operator symbol, value) tuples
+    """
+    items = spec.split(',') if isinstance(spec, str) else list(spec or [])
+    filters = []
+    for item in filter(None, (str(item).strip() for item in items)):
+        match = _CONDITION.match(item)
+        if not match:
+            raise ValueError(f"Invalid filter condition: {item} (expected e.g. marketCap>1e10)")
+        field, symbol, raw = match.groups()
+        raw = raw.strip('\'"')
+        try:
+            value = float(raw)
+        except ValueError:
+            value = raw
+        filters.append((field, symbol, value))
+    return filters
+
+
+def parse_sort(spec):
+    """
+    Parse sort keys such as "-returnOnEquity,marketCap" ('-' sorts descending)
+
+    Returns:
+        list: (field, ascending) tuples
+    """
+    items = spec.split(',') if isinstance(spec, str) else list(spec or [])
+    keys = []
+    for item in filter(None, (str(item).strip() for item in items)):
+        keys.append((item[1:], False) if item.startswith('-') else (item.lstrip('+'), True))
+    return keys
+
+
+def check_fields(snapshot, fields):
+    """Raise ValueError naming any field the snapshot has no column for"""
+    unknown = [field for field in fields if field not in snapshot.columns]
+    if unknown:
+        raise ValueError(f"Unknown screener field: {', '.join(unknown)}")
+
+
+def screen(snapshot, filters=(), sort=(), top=50):
+    """
+    Filter and rank a snapshot with whole-column operations
+
+    Rows where a filtered field is missing never match; missing sort values
+    rank last.
+
+    Args:
+        snapshot (pd.DataFrame): From build_snapshot
+        filters (list): From parse_filters
+        sort (list): From parse_sort
+        top (int): Number of rows to return (all when None)
+
+    Returns:
+        tuple: (top rows as a DataFrame, number of rows that matched)
+    """
+    check_fields(snapshot, [field for field, _, _ in filters] + [field for field, _ in sort])
+    mask = np.ones(len(snapshot), dtype=bool)
+    for field, symbol, value in filters:
+        column = snapshot[field]
+        if field in TEXT_FIELDS and symbol not in ('==', '!='):
+            raise ValueError(f"Screener field {field} is text and only supports == and !=")
+        if isinstance(value, float) and field in TEXT_FIELDS:
+            value = str(int(value)) if value.is_integer() else str(value)
+        elif isinstance(value, str) and field not in TEXT_FIELDS:
+            raise ValueError(f"Screener field {field} is numeric, got {value!r}")
+        mask &= (OPERATORS[symbol](column, value) & column.notna()).to_numpy()
+    matched = snapshot[mask]
+    if sort:
+        matched = matched.sort_values(
+            [field for field, _ in sort],
+            ascending=[ascending for _, ascending in sort],
+            na_position='last',
+            kind='stable',
+        )
+    count = len(matched)
+    if top is not None:
+        matched = matched.head(max(0, int(top)))
+    return matched, count
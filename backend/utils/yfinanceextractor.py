@@ -1,13 +1,528 @@
-import yfinance as yf
-import pandas as pd
+import argparse
+import errno
+import functools
 import json
+import multiprocessing
+import os
+import signal
+import socket
+import socketserver
+import stat
 import sys
-import requests
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime
+from extractor_cache import MISSING, SingleFlight, TTLCache
+from fx_rates import FxRateCache, make_fx_provider
+from instrumentation import bind, count, record_size, stage, traced
+import instrumentation
+from json_codec import make_encoder
+from lazy_import import LazyModule, import_timings
+import prefetch_scheduler
+from replay_backend import make_backend
 
-# Set User-Agent that bypasses Yahoo Finance bot detection (from GitHub issue #2297)
-# This specific older IE User-Agent has been reported to work consistently
-yf.utils.user_agent = 'Mozilla/4.0 (compatible; MSIE 6.0; Windows NT 5.2; .NET CLR 1.0.3705;)'
+_MODULE_STARTED = time.perf_counter()
+
+# Per-stage timings are opt-in: YFINANCE_TIMINGS=json|stderr|metrics (or --timings)
+instrumentation.configure(os.environ.get('YFINANCE_TIMINGS'))
+
+def _set_user_agent(module):
+    # Set User-Agent that bypasses Yahoo Finance bot detection (from GitHub issue #2297)
+    # This specific older IE User-Agent has been reported to work consistently
+    module.utils.user_agent = 'Mozilla/4.0 (compatible; MSIE 6.0; Windows NT 5.2; .NET CLR 1.0.3705;)'
+
+# yfinance, pandas and numpy take most of a cold start, so they are imported
+# on first use: cache hits, quote-only price calls and cache_stats never load
+# them. `--profile-startup` shows what each one costs.
+yf = LazyModule('yfinance', on_load=_set_user_agent)
+pd = LazyModule('pandas')
+np = LazyModule('numpy')
+http_session = LazyModule('http_session')
+fundamentals_store = LazyModule('fundamentals_store')
+derived_metrics = LazyModule('derived_metrics')
+screener = LazyModule('screener')
+price_history = LazyModule('price_history')
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def get_http_session():
+    """
+    One pooled keep-alive session shared by every Ticker, quote and FX call,
+    created on first use. It throttles requests per host (YFINANCE_RATE_LIMIT
+    per second, bursts of YFINANCE_RATE_BURST) and retries 429/5xx responses
+    with jittered backoff.
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            _http_session = http_session.make_session(
+                rate=float(os.environ.get('YFINANCE_RATE_LIMIT', '10')),
+                burst=int(os.environ.get('YFINANCE_RATE_BURST', '20')),
+                max_retries=int(os.environ.get('YFINANCE_MAX_RETRIES', '3')),
+                pool_size=int(os.environ.get('YFINANCE_POOL_SIZE', '32')),
+            )
+        return _http_session
+
+# Seconds each yf.Ticker dataset stays cached ('quote' is a row from the
+# multi-symbol quote endpoint, 'currencies' a symbol's reporting and listing
+# currency taken from info). Quotes and info move intraday; statements only
+# change when a new period is reported, currencies practically never. Override with e.g.
+# YFINANCE_CACHE_TTLS="info=10,income_stmt=3600" (a TTL of 0 disables caching).
+CACHE_TTLS = {
+    'quote': 15,
+    'info': 30,
+    'income_stmt': 24 * 3600,
+    'balance_sheet': 24 * 3600,
+    'cash_flow': 24 * 3600,
+    'quarterly_income_stmt': 6 * 3600,
+    'currencies': 7 * 24 * 3600,
+}
+
+def _parse_cache_ttls(spec):
+    ttls = dict(CACHE_TTLS)
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        dataset, _, seconds = item.partition('=')
+        try:
+            ttls[dataset.strip()] = float(seconds)
+        except ValueError:
+            print(f"Ignoring invalid cache TTL: {item}", file=sys.stderr)
+    return ttls
+
+# Set YFINANCE_CACHE_DIR to keep cached payloads on disk across restarts
+_cache = TTLCache(
+    _parse_cache_ttls(os.environ.get('YFINANCE_CACHE_TTLS', '')),
+    max_entries=int(os.environ.get('YFINANCE_CACHE_MAX_ENTRIES', '1024')),
+    cache_dir=os.environ.get('YFINANCE_CACHE_DIR') or None,
+    max_disk_bytes=int(float(os.environ.get('YFINANCE_CACHE_MAX_DISK_MB', '256')) * 1024 * 1024),
+)
+
+# Concurrent identical work shares one execution: one for upstream dataset
+# fetches on a cache miss, one for whole commands (see run_command)
+_dataset_flights = SingleFlight()
+_command_flights = SingleFlight()
+
+def _fetch_live(symbol, dataset):
+    return getattr(yf.Ticker(symbol, session=get_http_session()), dataset)
+
+def _fetch_upstream(symbol, dataset):
+    count('upstream_calls')
+    with stage('upstream'):
+        value = _backend.fetch(symbol, dataset) if _backend is not None else _fetch_live(symbol, dataset)
+    # DataFrame cells or info keys
+    size = getattr(value, 'size', None)
+    record_size('upstream_values', size if isinstance(size, int) else len(value or ()))
+    return value
+
+def fetch_dataset(symbol, dataset):
+    """
+    Return one yf.Ticker dataset (e.g. 'info', 'income_stmt'), served from the
+    cache while it is fresh. The returned object is shared and must not be modified.
+    
+    Args:
+        symbol (str): Stock symbol
+        dataset (str): Name of the yf.Ticker property to read
+    
+    Returns:
+        The DataFrame or dict returned by yfinance
+    """
+    value = _cache.get(symbol, dataset)
+    if value is MISSING:
+        value = _dataset_flights.do((symbol.upper(), dataset), _fetch_and_cache, symbol, dataset)
+    else:
+        count('cache_hits')
+    return value
+
+# Statement datasets and the length of one reporting period in days. With
+# YFINANCE_STORE_DIR set, these are kept in a local SQLite store and Yahoo is
+# only contacted once a period newer than the latest stored one can exist
+# (and then at most every YFINANCE_STORE_RECHECK seconds until it appears).
+STATEMENT_PERIOD_DAYS = {
+    'income_stmt': 365,
+    'balance_sheet': 365,
+    'cash_flow': 365,
+    'quarterly_income_stmt': 91,
+}
+STORE_RECHECK_SECONDS = float(os.environ.get('YFINANCE_STORE_RECHECK', str(24 * 3600)))
+
+STORE_DIR = os.environ.get('YFINANCE_STORE_DIR')
+_store = None
+_store_lock = threading.Lock()
+
+def _get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = fundamentals_store.FundamentalsStore(STORE_DIR)
+        return _store
+
+def _new_period_due(symbol, dataset):
+    store = _get_store()
+    latest = store.latest_period(symbol, dataset)
+    if latest is None:
+        return True
+    if pd.Timestamp.now() < latest + pd.Timedelta(days=STATEMENT_PERIOD_DAYS[dataset]):
+        return False
+    last_checked = store.last_checked(symbol, dataset)
+    return last_checked is None or time.time() - last_checked >= STORE_RECHECK_SECONDS
+
+def refresh_statement(symbol, dataset, force=False):
+    """
+    Bring one stored statement up to date and return it
+    
+    Args:
+        symbol (str): Stock symbol
+        dataset (str): One of STATEMENT_PERIOD_DAYS
+        force (bool): Contact Yahoo even if no new period is due yet
+    
+    Returns:
+        tuple: (statement DataFrame, number of new values stored)
+    """
+    store = _get_store()
+    if not force and not _new_period_due(symbol, dataset):
+        return store.load(symbol, dataset), 0
+    
+    fresh = _fetch_upstream(symbol, dataset)
+    written = 0
+    if fresh is not None and not fresh.empty:
+        written = store.save(symbol, dataset, fresh)
+    store.mark_checked(symbol, dataset)
+    stored = store.load(symbol, dataset)
+    return (stored if stored is not None else fresh), written
+
+def read_symbol_list(spec):
+    """
+    Symbols from a list, a comma-separated string, or a file with one symbol
+    (or several comma-separated ones) per line, without duplicates
+    """
+    if isinstance(spec, str):
+        if os.path.isfile(spec):
+            with open(spec, 'r', encoding='utf-8') as f:
+                spec = f.read().replace('\n', ',')
+        spec = spec.split(',')
+    return list(dict.fromkeys(s.strip() for s in spec if s and s.strip()))
+
+def refresh_universe(symbols, max_workers=8):
+    """
+    Bulk-refresh every stored statement for a list of symbols, e.g. off-peak
+    from cron, so daytime requests are served from the local store
+    
+    Args:
+        symbols (list): Stock symbols
+        max_workers (int): Symbols refreshed at the same time
+    
+    Returns:
+        dict: Summary with per-symbol new value counts and errors
+    """
+    if not STORE_DIR:
+        return {"error": "Set YFINANCE_STORE_DIR to enable the fundamentals store"}
+    
+    def refresh_symbol(symbol):
+        return sum(refresh_statement(symbol, dataset, force=True)[1] for dataset in STATEMENT_PERIOD_DAYS)
+    
+    started = time.time()
+    symbols = list(dict.fromkeys(s.strip() for s in symbols if s and s.strip()))
+    summary = {'symbols': len(symbols), 'new_values': {}, 'errors': {}}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(refresh_symbol, symbol): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                summary['new_values'][symbol] = future.result()
+            except Exception as e:
+                summary['errors'][symbol] = str(e)
+    summary['duration_seconds'] = round(time.time() - started, 2)
+    return summary
+
+# The info fields currency conversion needs, cached on their own as the
+# 'currencies' dataset so converted statements don't refetch info every 30s
+CURRENCY_FIELDS = ('financialCurrency', 'currency')
+
+def _cache_currencies(symbol, info):
+    currencies = {field: info.get(field) for field in CURRENCY_FIELDS}
+    # A partial pair may be a truncated response; keep it out of the long TTL
+    if all(currencies.values()):
+        _cache.set(symbol, 'currencies', currencies)
+    return currencies
+
+def _fetch_and_cache(symbol, dataset, min_ttl=None):
+    if dataset == 'currencies':
+        return _cache_currencies(symbol, fetch_dataset(symbol, 'info'))
+    if STORE_DIR and dataset in STATEMENT_PERIOD_DAYS:
+        value, _ = refresh_statement(symbol, dataset)
+    else:
+        value = _fetch_upstream(symbol, dataset)
+    # Don't pin an empty response (often a transient Yahoo failure) for the whole TTL
+    if value is not None and len(value) > 0:
+        _cache.set(symbol, dataset, value, min_ttl=min_ttl)
+        if dataset == 'info':
+            _cache_currencies(symbol, value)
+    return value
+
+# Pool for the per-dataset fetches inside a single call. It is separate from the
+# batch/serve pools so a task there can wait on these without risking deadlock.
+_fetch_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('YFINANCE_FETCH_WORKERS', '16')),
+    thread_name_prefix='yf-fetch',
+)
+
+# Set YFINANCE_PARALLEL_FETCH=0 to fetch a symbol's datasets one after another
+PARALLEL_FETCH = os.environ.get('YFINANCE_PARALLEL_FETCH', '1') != '0'
+
+def fetch_datasets(symbol, datasets, parallel=None):
+    """
+    Fetch several datasets for one symbol, concurrently unless disabled
+    
+    Args:
+        symbol (str): Stock symbol
+        datasets (list): yf.Ticker property names
+        parallel (bool): Issue the fetches concurrently (defaults to PARALLEL_FETCH)
+    
+    Returns:
+        dict: dataset -> fetched value, or the exception raised while fetching
+            it, so one failing dataset doesn't discard the others
+    """
+    if parallel is None:
+        parallel = PARALLEL_FETCH
+    
+    results = {}
+    if parallel and len(datasets) > 1:
+        futures = {dataset: _fetch_pool.submit(bind(fetch_dataset), symbol, dataset) for dataset in datasets}
+        for dataset, future in futures.items():
+            try:
+                results[dataset] = future.result()
+            except Exception as e:
+                results[dataset] = e
+    else:
+        for dataset in datasets:
+            try:
+                results[dataset] = fetch_dataset(symbol, dataset)
+            except Exception as e:
+                results[dataset] = e
+    return results
+
+# Yahoo's multi-symbol quote endpoint; one request returns quote fields
+# (prices, day range, 52-week range, moving averages) for many symbols
+YAHOO_QUOTE_URL = 'https://query1.finance.yahoo.com/v7/finance/quote'
+QUOTE_BATCH_SIZE = 100
+
+def _fetch_live_quotes(symbols):
+    # YfData is yfinance's shared client; it takes care of the cookie/crumb
+    data = yf.data.YfData(session=get_http_session()).get_raw_json(
+        YAHOO_QUOTE_URL,
+        params={'symbols': ','.join(symbols), 'formatted': 'false', 'lang': 'en-US', 'region': 'US'},
+        timeout=10,
+    )
+    results = (data.get('quoteResponse') or {}).get('result') or []
+    return {quote['symbol']: quote for quote in results if quote.get('symbol')}
+
+def _fetch_upstream_quotes(symbols):
+    count('upstream_quote_calls')
+    with stage('upstream'):
+        quotes = _backend.fetch_quotes(symbols) if _backend is not None else _fetch_live_quotes(symbols)
+    record_size('upstream_quotes', len(quotes))
+    return quotes
+
+def _fetch_live_history(symbols, start, end=None):
+    data = yf.download(
+        list(symbols), start=start, end=end, interval='1d', group_by='ticker', auto_adjust=False,
+        actions=False, threads=True, progress=False, session=get_http_session(),
+    )
+    if data is None or data.empty:
+        return {}
+    if not isinstance(data.columns, pd.MultiIndex):
+        return {symbols[0]: data}
+    tickers = set(data.columns.get_level_values(0))
+    return {symbol: data[symbol] for symbol in symbols if symbol in tickers}
+
+def _fetch_upstream_history(symbols, start, end=None):
+    count('upstream_history_calls')
+    with stage('upstream'):
+        if _backend is not None:
+            histories = _backend.fetch_history(symbols, start, end)
+        else:
+            histories = _fetch_live_history(symbols, start, end)
+    record_size('upstream_bars', sum(len(bars) for bars in histories.values()))
+    return histories
+
+# YFINANCE_BACKEND=replay:DIR serves recorded responses instead of calling
+# Yahoo (for benchmarks and offline runs); record:DIR captures them.
+_backend = make_backend(os.environ.get('YFINANCE_BACKEND'), _fetch_live, _fetch_live_quotes, _fetch_live_history)
+
+def fetch_quotes(symbols, refresh=False):
+    """
+    Fetch quote data for many symbols with as few upstream requests as
+    possible: cached quotes are reused and the rest are requested in batches
+    of QUOTE_BATCH_SIZE symbols per call.
+    
+    Args:
+        symbols (list): Stock or index symbols
+        refresh (bool): Request every symbol, ignoring cached quotes
+    
+    Returns:
+        dict: uppercase symbol -> quote dict (Yahoo's canonical form);
+            symbols Yahoo didn't return are absent
+    """
+    quotes = {}
+    missing = []
+    for symbol in dict.fromkeys(symbol.upper() for symbol in symbols):
+        quote = MISSING if refresh else _cache.get(symbol, 'quote')
+        if quote is MISSING:
+            missing.append(symbol)
+        else:
+            quotes[symbol] = quote
+    if quotes:
+        count('cache_hits', len(quotes))
+    
+    chunks = [missing[i:i + QUOTE_BATCH_SIZE] for i in range(0, len(missing), QUOTE_BATCH_SIZE)]
+    futures = [_fetch_pool.submit(bind(_fetch_upstream_quotes), chunk) for chunk in chunks]
+    for future in futures:
+        for symbol, quote in future.result().items():
+            _cache.set(symbol, 'quote', quote)
+            quotes[symbol.upper()] = quote
+    return quotes
+
+# Daily bars are kept in memory-mapped column files under YFINANCE_HISTORY_DIR.
+# A symbol's first request loads YFINANCE_HISTORY_YEARS of history (or from its
+# start date); later ones only fetch bars after the latest stored one, at most
+# every YFINANCE_HISTORY_RECHECK seconds.
+HISTORY_DIR = os.environ.get('YFINANCE_HISTORY_DIR') or os.path.join(tempfile.gettempdir(), 'yfinance-history')
+HISTORY_YEARS = int(os.environ.get('YFINANCE_HISTORY_YEARS', '5'))
+HISTORY_RECHECK_SECONDS = float(os.environ.get('YFINANCE_HISTORY_RECHECK', '900'))
+HISTORY_BATCH_SIZE = 50
+
+_history_store = None
+_history_store_lock = threading.Lock()
+
+def _get_history_store():
+    global _history_store
+    with _history_store_lock:
+        if _history_store is None:
+            _history_store = price_history.HistoryStore(HISTORY_DIR)
+        return _history_store
+
+def _store_history_range(symbols, start, end):
+    store = _get_history_store()
+    histories = _fetch_upstream_history(symbols, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d') if end is not None else None)
+    added = {}
+    for symbol in symbols:
+        bars = histories.get(symbol)
+        if end is not None:
+            added[symbol] = store.prepend(symbol, bars) if bars is not None else 0
+        else:
+            added[symbol] = store.append(symbol, bars) if bars is not None else 0
+            store.update_meta(symbol, checked_at=time.time())
+        meta = store.meta(symbol)
+        if not meta.get('covered_from') or start < pd.Timestamp(meta['covered_from']):
+            store.update_meta(symbol, covered_from=start.strftime('%Y-%m-%d'))
+    return added
+
+def refresh_history(symbols, start=None, force=False):
+    """
+    Bring the stored daily bars of many symbols up to date, fetching only the
+    missing date ranges. Symbols that need the same range share one
+    multi-symbol download.
+    
+    Args:
+        symbols (list): Stock symbols
+        start: Earliest date needed; older bars are backfilled if missing
+        force (bool): Check for new bars even if checked recently
+    
+    Returns:
+        dict: symbol -> number of bars added
+    """
+    store = _get_history_store()
+    today = pd.Timestamp.now().normalize()
+    start = pd.Timestamp(start).normalize() if start else None
+    ranges = {}  # (start, end or None) -> symbols; end is exclusive
+    for symbol in dict.fromkeys(symbols):
+        last = store.last_date(symbol)
+        meta = store.meta(symbol)
+        recheck_due = force or time.time() - meta.get('checked_at', 0) >= HISTORY_RECHECK_SECONDS
+        if last is None:
+            # Symbols Yahoo had no bars for are retried on the recheck interval
+            if recheck_due:
+                ranges.setdefault((start or today - pd.DateOffset(years=HISTORY_YEARS), None), []).append(symbol)
+            continue
+        covered_from = pd.Timestamp(meta['covered_from']) if meta.get('covered_from') else store.first_date(symbol)
+        if start is not None and start < covered_from:
+            ranges.setdefault((start, store.first_date(symbol)), []).append(symbol)
+        if recheck_due:
+            # From the latest stored bar, which may have been an intraday one
+            ranges.setdefault((last, None), []).append(symbol)
+    
+    futures = []
+    for (range_start, range_end), group in ranges.items():
+        for i in range(0, len(group), HISTORY_BATCH_SIZE):
+            chunk = tuple(group[i:i + HISTORY_BATCH_SIZE])
+            futures.append(_fetch_pool.submit(
+                bind(_dataset_flights.do), ('history', chunk, range_start, range_end),
+                _store_history_range, chunk, range_start, range_end))
+    added = dict.fromkeys(dict.fromkeys(symbols), 0)
+    for future in futures:
+        for symbol, n in future.result().items():
+            added[symbol] += n
+    return added
+
+def get_cache_stats():
+    """
+    Cache hit/miss counters for confirming the reduction in upstream calls
+    
+    Returns:
+        dict: Counters from the shared dataset cache, plus how many dataset
+            fetches and commands were served by an identical in-flight call
+    """
+    stats = _cache.stats()
+    stats['coalesced_fetches'] = _dataset_flights.shared
+    stats['coalesced_commands'] = _command_flights.shared
+    if _metrics_memo is not None:
+        stats['derived_metrics_hits'] = _metrics_memo.hits
+        stats['derived_metrics_computed'] = _metrics_memo.computed
+    return stats
+
+def render_metrics():
+    """
+    Prometheus text dump for --serve mode: per-command request, stage,
+    upstream-call and payload-size counters (collected when timings are
+    enabled), plus the current cache counters as gauges
+    """
+    stats = get_cache_stats()
+    return instrumentation.metrics.render({
+        f'extractor_cache_{name}': value for name, value in stats.items() if name != 'max_entries'
+    })
+
+# Responses are encoded with orjson when it is installed, otherwise with the
+# stdlib; YFINANCE_JSON_ENCODER=json|orjson picks one explicitly
+_json_encoder = make_encoder(os.environ.get('YFINANCE_JSON_ENCODER'))
+
+def to_json(obj):
+    """
+    Encode a response compactly. NaN becomes null, timestamps become
+    'YYYY-MM-DD' and NumPy/pandas scalars are written as plain numbers, so
+    values can be passed through without calling serialize_value on each.
+    """
+    return _json_encoder.dumps(obj)
+
+def truncate_summary(text):
+    """Shorten a longBusinessSummary to about 500 bytes, ending on a full sentence where possible"""
+    # If text is longer than 250 bytes
+    if len(text.encode('utf-8')) > 500:
+        # Find the last period after 250 bytes
+        truncated = text[:500]  # Get first 250 characters as starting point
+        last_period = truncated.rfind('.')
+        if last_period != -1:
+            return text[:last_period + 1]  # Include the period
+        else:
+            # If no period found, find the nearest space after 250 bytes
+            space_pos = text.find(' ', 500)
+            if space_pos != -1:
+                return text[:space_pos] + '...'
+            else:
+                return text[:500] + '...'
+    return text
 
 def serialize_value(v, key=None):
     if isinstance(v, pd.Timestamp):
@@ -21,58 +536,200 @@ def serialize_value(v, key=None):
     elif isinstance(v, pd.DataFrame):
         return v.to_dict()
     elif key == 'longBusinessSummary' and isinstance(v, str):
-        # If text is longer than 250 bytes
-        if len(v.encode('utf-8')) > 500:
-            # Find the last period after 250 bytes
-            text = v[:500]  # Get first 250 characters as starting point
-            last_period = text.rfind('.')
-            if last_period != -1:
-                return v[:last_period + 1]  # Include the period
-            else:
-                # If no period found, find the nearest space after 250 bytes
-                space_pos = v.find(' ', 500)
-                if space_pos != -1:
-                    return v[:space_pos] + '...'
-                else:
-                    return v[:500] + '...'
-        return v
+        return truncate_summary(v)
     else:
         return v
 
-def get_usd_to_inr_rate():
+# Statement layouts: 'records' is {period: {field: value}}; 'columnar' is
+# {"fields": [...], "values": {period: [value per field]}}, which names each
+# field once instead of once per period and writes whole numbers without '.0'
+LAYOUTS = ('records', 'columnar')
+
+def _compact_numbers(values):
+    """Float matrix -> object matrix with None for NaN/inf and ints for whole numbers"""
+    finite = np.isfinite(values)
+    with np.errstate(invalid='ignore'):
+        whole = finite & (np.abs(values) < 2 ** 53) & (np.mod(values, 1) == 0)
+    compact = values.astype(object)
+    compact[whole] = values[whole].astype(np.int64).tolist()
+    compact[~finite] = None
+    return compact
+
+def serialize_statement(df, fields, period_key=str, exchange_rate=None, layout='records'):
     """
-    Fetch the latest USD to INR exchange rate from exchangerate-api.com
+    Serialize the wanted rows of a statement DataFrame in one columnar pass
+    
+    Produces the same {period: {field: value}} mapping as filtering
+    df.to_dict() and calling serialize_value on every cell, but selects the
+    rows once with a vectorized index lookup and converts NaN and timestamps
+    over whole arrays.
+    
+    Args:
+        df (pd.DataFrame): Statement with fields as rows and periods as columns
+        fields (list): Row labels to keep, or None when df already holds
+            only the wanted rows
+        period_key (callable): Turns a column label into the output key
+        exchange_rate (float): When given, monetary rows are converted with
+            convert_statement before serializing
+        layout (str): 'records' or 'columnar' (see LAYOUTS)
     
     Returns:
-        float: USD to INR conversion rate, or None if failed
+        dict: {period_key(period): {field: value}}, or for the columnar
+            layout {"fields": [field, ...], "values": {period_key(period): [value, ...]}}
     """
-    try:
-        url = "https://v6.exchangerate-api.com/v6/3f2f57927a3c29e06bee862d/latest/USD"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
+    if fields is None:
+        selected = df
+    else:
+        with stage('filter'):
+            selected = df[df.index.isin(fields)]
+    if exchange_rate:
+        with stage('convert'):
+            selected = convert_statement(selected, exchange_rate)
+    
+    with stage('serialize'):
+        dtypes = selected.dtypes.tolist()
+        row_labels = [str(label) for label in selected.index]
+        if layout == 'columnar' and dtypes and all(dtype.kind == 'f' for dtype in dtypes):
+            values = _compact_numbers(selected.to_numpy(dtype=float))
+            return {
+                'fields': row_labels,
+                'values': {period_key(period): values[:, position].tolist() for position, period in enumerate(selected.columns)},
+            }
         
-        data = response.json()
-        if data.get('result') == 'success':
-            inr_rate = data.get('conversion_rates', {}).get('INR')
-            if inr_rate:
-                # Only log to stderr to avoid interfering with JSON output
-                print(f"Fetched USD to INR rate: {inr_rate}", file=sys.stderr)
-                return float(inr_rate)
+        if any(pd.api.types.is_datetime64_any_dtype(dtype) for dtype in dtypes):
+            selected = selected.apply(
+                lambda col: col.dt.strftime('%Y-%m-%d').astype(object)
+                if pd.api.types.is_datetime64_any_dtype(col.dtype) else col
+            )
         
-        print("Failed to get valid exchange rate from API", file=sys.stderr)
-        return None
+        values = selected.to_numpy(dtype=object, copy=True)
+        values[pd.isna(values)] = None
+        if any(dtype == object for dtype in dtypes):
+            # Mixed columns can still hold individual Timestamp/datetime cells
+            is_datetime = np.frompyfunc(lambda v: isinstance(v, datetime), 1, 1)(values).astype(bool)
+            if is_datetime.any():
+                values[is_datetime] = [v.strftime('%Y-%m-%d') for v in values[is_datetime]]
         
-    except Exception as e:
-        print(f"Error fetching exchange rate: {str(e)}", file=sys.stderr)
-        return None
+        if layout == 'columnar':
+            return {
+                'fields': row_labels,
+                'values': {period_key(period): values[:, position].tolist() for position, period in enumerate(selected.columns)},
+            }
+        return {
+            period_key(period): dict(zip(row_labels, values[:, position].tolist()))
+            for position, period in enumerate(selected.columns)
+        }
+
+# Exchange rates are cached for YFINANCE_FX_TTL seconds and refreshed in the
+# background before they expire. YFINANCE_FX_PROVIDER selects the source, e.g.
+# 'file:/path/rates.json' or 'static:USD/INR=83.2' for tests and offline use.
+_fx_rates = FxRateCache(
+    make_fx_provider(os.environ.get('YFINANCE_FX_PROVIDER'), get_http_session),
+    ttl=float(os.environ.get('YFINANCE_FX_TTL', '3600')),
+)
+
+def get_exchange_rate(from_currency, to_currency):
+    """
+    Look up an exchange rate through the shared FX cache
+    
+    Args:
+        from_currency (str): ISO code of the source currency, e.g. 'USD'
+        to_currency (str): ISO code of the target currency, e.g. 'INR'
+    
+    Returns:
+        tuple: (rate or None, details) where details reports whether the rate
+            is stale, when it was fetched and which provider supplied it
+    """
+    return _fx_rates.get_rate(from_currency, to_currency)
+
+def get_usd_to_inr_rate():
+    """
+    Get the latest USD to INR exchange rate (cached, see get_exchange_rate)
+    
+    Returns:
+        float: USD to INR conversion rate, or None if failed
+    """
+    rate, _ = get_exchange_rate('USD', 'INR')
+    return rate
+
+# Fields holding monetary amounts in the reporting currency; these are the ones
+# converted when a symbol reports in a different currency than it is shown in
+MONETARY_FIELDS = frozenset([
+    # Income Statement fields
+    'Net Income From Continuing Operation Net Minority Interest',
+    'EBITDA', 'EBIT', 'Interest Expense', 'Interest Income',
+    'Net Income From Continuing And Discontinued Operation',
+    'Net Income Common Stockholders', 'Net Income',
+    'Net Income Including Noncontrolling Interests',
+    'Tax Provision', 'Operating Income', 'Operating Expense',
+    'Depreciation And Amortization In Income Statement',
+    'Amortization', 'Depreciation Income Statement',
+    'Selling General And Administration', 'Selling And Marketing Expense',
+    'General And Administrative Expense', 'Gross Profit',
+    'Cost Of Revenue', 'Total Revenue', 'Operating Revenue',
+    
+    # Balance Sheet fields
+    'Net Debt', 'Total Debt', 'Tangible Book Value', 'Working Capital',
+    'Net Tangible Assets', 'Capital Lease Obligations',
+    'Common Stock Equity', 'Stockholders Equity', 'Other Equity Interest',
+    'Retained Earnings', 'Total Liabilities Net Minority Interest',
+    'Other Non Current Liabilities', 'Long Term Debt And Capital Lease Obligation',
+    'Long Term Debt', 'Long Term Provisions', 'Current Liabilities',
+    'Current Debt And Capital Lease Obligation', 'Current Debt',
+    'Payables', 'Dividends Payable', 'Total Tax Payable',
+    'Accounts Payable', 'Total Assets', 'Total Non Current Assets',
+    'Other Non Current Assets', 'Goodwill And Other Intangible Assets',
+    'Other Intangible Assets', 'Goodwill', 'Net PPE', 'Current Assets',
+    'Other Current Assets', 'Inventory', 'Other Receivables',
+    'Taxes Receivable', 'Accounts Receivable', 'Gross Accounts Receivable',
+    'Cash Cash Equivalents And Short Term Investments',
+    'Other Short Term Investments', 'Cash And Cash Equivalents', 'Cash Equivalents',
+    
+    # Cash Flow fields
+    'Free Cash Flow', 'Repayment Of Debt', 'Issuance Of Debt',
+    'Capital Expenditure', 'Changes In Cash',
+    'Financing Cash Flow', 'Cash Dividends Paid', 'Long Term Debt Payments', 'Sale Of Investment',
+    'Purchase Of Investment', 'Net Business Purchase And Sale',
+    'Sale Of Business', 'Purchase Of Business', 'Net PPE Purchase And Sale',
+    'Capital Expenditure Reported', 'Operating Cash Flow',
+    'Change In Working Capital', 'Change In Other Current Assets',
+    'Change In Payable', 'Change In Receivables',
+    'Depreciation And Amortization', 'Net Income From Continuing Operations',
+    
+    # Info fields
+    # 'currentPrice', 'dayHigh', 'dayLow', 'previousClose',
+    # 'dividendRate', 'marketCap', 'fiftyTwoWeekLow', 'fiftyTwoWeekHigh',
+    # 'fiftyDayAverage', 'twoHundredDayAverage', 'regularMarketPrice',
+    'bookValue','totalCash','totalDebt', 'grossProfits',
+    
+    # Quarterly fields
+    'Pretax Income', 'Net Income Continuous Operations',
+    'Basic EPS', 'Net Interest Income', 'Reconciled Cost Of Revenue',
+    'Reconciled Depreciation', 'Total Unusual Items Excluding Goodwill',
+    'Normalized EBITDA'
+])
+
+# Currency each symbol's statements are converted to, looked up by exact
+# symbol, then exchange suffix (e.g. '.NS'), then '*'. A value of 'listing'
+# means the symbol's trading currency from info; 'none' disables conversion.
+# By default only Indian listings are converted (e.g. INFY.NS reports in USD);
+# extend with e.g. YFINANCE_CURRENCY_TARGETS="TSM=listing,.L=GBP".
+CURRENCY_TARGETS = {
+    '.NS': 'listing',
+    '.BO': 'listing',
+    '*': 'none',
+}
+
+# Yahoo quotes some listings in minor units; statements use the major currency
+MINOR_CURRENCY_UNITS = {'GBp': 'GBP', 'GBX': 'GBP', 'ZAc': 'ZAR', 'ILA': 'ILS'}
 
 def convert_financial_value(value, exchange_rate):
     """
-    Convert a financial value from USD to INR
+    Convert a financial value using an exchange rate
     
     Args:
         value: The value to convert (can be None, number, or string)
-        exchange_rate (float): USD to INR conversion rate
+        exchange_rate (float): Conversion rate from the reporting currency
     
     Returns:
         Converted value or None if input is None
@@ -95,27 +752,138 @@ def convert_financial_value(value, exchange_rate):
     except Exception:
         return value
 
-def should_convert_currency(symbol):
+def _parse_currency_targets(spec):
+    targets = dict(CURRENCY_TARGETS)
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        key, _, target = item.partition('=')
+        targets[key.strip().upper()] = target.strip()
+    return targets
+
+_currency_targets = _parse_currency_targets(os.environ.get('YFINANCE_CURRENCY_TARGETS', ''))
+
+def _major_currency(currency):
+    return MINOR_CURRENCY_UNITS.get(currency, currency.upper()) if currency else None
+
+def _target_spec(symbol):
+    symbol = symbol.upper()
+    suffix = '.' + symbol.rsplit('.', 1)[1] if '.' in symbol else None
+    return _currency_targets.get(symbol) or (suffix and _currency_targets.get(suffix)) or _currency_targets.get('*', 'none')
+
+def conversion_configured(symbol):
+    """Whether the conversion table converts symbol at all (decided without fetching info)"""
+    return _target_spec(symbol).lower() != 'none'
+
+def resolve_target_currency(symbol, info):
+    """
+    Find the currency a symbol's statements should be reported in
+    
+    The exact symbol entry in the conversion table wins, then its exchange
+    suffix (e.g. '.NS'), then the '*' default.
+    
+    Args:
+        symbol (str): Stock symbol
+        info (dict): yf.Ticker info, used for the 'listing' target
+    
+    Returns:
+        str: ISO currency code, or None if the symbol should not be converted
+    """
+    target = _target_spec(symbol)
+    if target.lower() == 'none':
+        return None
+    if target.lower() == 'listing':
+        target = info.get('currency')
+    return _major_currency(target)
+
+def plan_currency_conversion(symbol, info):
     """
-    Determine if the symbol needs currency conversion from USD to INR
+    Decide whether a symbol's statements need converting and look up the rate
     
     Args:
         symbol (str): Stock symbol
+        info (dict): yf.Ticker info or the 'currencies' dataset (only
+            financialCurrency and currency are used), or None when it could
+            not be fetched
+    
+    Returns:
+        tuple: (exchange rate or None, 'currency_conversion' metadata dict).
+            When a conversion is configured but info or the rate is missing,
+            the metadata carries 'failed': True and the values stay in the
+            reporting currency.
+    """
+    if not conversion_configured(symbol):
+        return None, {'applied': False, 'reason': 'No conversion needed'}
+    if not info:
+        print(f"Warning: No currency information for {symbol}. Data will not be converted.", file=sys.stderr)
+        return None, {'applied': False, 'failed': True, 'reason': 'Currency information not available'}
+    
+    from_currency = _major_currency(info.get('financialCurrency'))
+    to_currency = resolve_target_currency(symbol, info)
+    if not from_currency or not to_currency:
+        print(f"Warning: Currencies of {symbol} are unknown. Data will not be converted.", file=sys.stderr)
+        return None, {'applied': False, 'failed': True, 'reason': 'Currency information not available',
+                      'from_currency': from_currency, 'to_currency': to_currency}
+    if from_currency == to_currency:
+        return None, {'applied': False, 'reason': 'No conversion needed'}
+    
+    exchange_rate, rate_details = get_exchange_rate(from_currency, to_currency)
+    if not exchange_rate:
+        print(f"Warning: Could not fetch exchange rate for {symbol}. Data will remain in {from_currency}.", file=sys.stderr)
+        return None, {'applied': False, 'failed': True, 'reason': 'Exchange rate not available',
+                      'from_currency': from_currency, 'to_currency': to_currency}
+    
+    print(f"Converting financial data for {symbol} from {from_currency} to {to_currency} using rate: {exchange_rate}", file=sys.stderr)
+    return exchange_rate, {
+        'applied': True,
+        'from_currency': from_currency,
+        'to_currency': to_currency,
+        'exchange_rate': exchange_rate,
+        'stale': rate_details.get('stale', False),
+        'rate_time': rate_details.get('fetched_at'),
+        'conversion_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+def convert_statement(df, exchange_rate):
+    """
+    Scale the monetary rows of a statement DataFrame by exchange_rate in one
+    vectorized operation (rounded to 2 decimals like convert_financial_value).
+    Non-numeric cells are left untouched.
     
     Returns:
-        bool: True if conversion is needed, False otherwise
+        pd.DataFrame: Converted copy, or df itself when nothing needs converting
     """
-    # INFY.NS comes in USD but should be converted to INR
-    usd_symbols = ['INFY.NS']
-    return symbol.upper() in [s.upper() for s in usd_symbols]
+    mask = df.index.isin(MONETARY_FIELDS)
+    if not exchange_rate or not mask.any():
+        return df
+    
+    monetary = df[mask]
+    numeric = monetary.apply(pd.to_numeric, errors='coerce')
+    if (df.dtypes == object).any():
+        converted = df.astype(object)
+    else:
+        # Integer columns can't hold the rounded values (pandas 3 raises
+        # rather than upcasting), so widen them to float first
+        converted = df.astype({column: float for column, dtype in df.dtypes.items() if dtype.kind in 'iub'})
+    converted[mask] = numeric.mul(exchange_rate).round(2).where(numeric.notna(), monetary)
+    return converted
+
+def convert_info_fields(info, exchange_rate):
+    """Convert the monetary fields of an (already filtered) info dict"""
+    if not exchange_rate:
+        return info
+    return {
+        key: convert_financial_value(value, exchange_rate) if key in MONETARY_FIELDS else value
+        for key, value in info.items()
+    }
 
 def convert_financial_data(data, exchange_rate):
     """
-    Convert financial data from USD to INR for specific financial fields
+    Convert the MONETARY_FIELDS found anywhere in a nested result dictionary.
+    The extractor converts DataFrames with convert_statement before
+    serializing; this handles data that is already in dict form.
     
     Args:
         data (dict): Financial data dictionary
-        exchange_rate (float): USD to INR conversion rate
+        exchange_rate (float): Conversion rate from the reporting currency
     
     Returns:
         dict: Converted financial data
@@ -123,68 +891,12 @@ def convert_financial_data(data, exchange_rate):
     if not exchange_rate:
         return data
     
-    # Define fields that should be converted (financial/monetary values)
-    financial_fields = [
-        # Income Statement fields
-        'Net Income From Continuing Operation Net Minority Interest',
-        'EBITDA', 'EBIT', 'Interest Expense', 'Interest Income',
-        'Net Income From Continuing And Discontinued Operation',
-        'Net Income Common Stockholders', 'Net Income',
-        'Net Income Including Noncontrolling Interests',
-        'Tax Provision', 'Operating Income', 'Operating Expense',
-        'Depreciation And Amortization In Income Statement',
-        'Amortization', 'Depreciation Income Statement',
-        'Selling General And Administration', 'Selling And Marketing Expense',
-        'General And Administrative Expense', 'Gross Profit',
-        'Cost Of Revenue', 'Total Revenue', 'Operating Revenue',
-        
-        # Balance Sheet fields
-        'Net Debt', 'Total Debt', 'Tangible Book Value', 'Working Capital',
-        'Net Tangible Assets', 'Capital Lease Obligations',
-        'Common Stock Equity', 'Stockholders Equity', 'Other Equity Interest',
-        'Retained Earnings', 'Total Liabilities Net Minority Interest',
-        'Other Non Current Liabilities', 'Long Term Debt And Capital Lease Obligation',
-        'Long Term Debt', 'Long Term Provisions', 'Current Liabilities',
-        'Current Debt And Capital Lease Obligation', 'Current Debt',
-        'Payables', 'Dividends Payable', 'Total Tax Payable',
-        'Accounts Payable', 'Total Assets', 'Total Non Current Assets',
-        'Other Non Current Assets', 'Goodwill And Other Intangible Assets',
-        'Other Intangible Assets', 'Goodwill', 'Net PPE', 'Current Assets',
-        'Other Current Assets', 'Inventory', 'Other Receivables',
-        'Taxes Receivable', 'Accounts Receivable', 'Gross Accounts Receivable',
-        'Cash Cash Equivalents And Short Term Investments',
-        'Other Short Term Investments', 'Cash And Cash Equivalents', 'Cash Equivalents',
-        
-        # Cash Flow fields
-        'Free Cash Flow', 'Repayment Of Debt', 'Issuance Of Debt',
-        'Capital Expenditure', 'Changes In Cash',
-        'Financing Cash Flow', 'Cash Dividends Paid', 'Long Term Debt Payments', 'Sale Of Investment',
-        'Purchase Of Investment', 'Net Business Purchase And Sale',
-        'Sale Of Business', 'Purchase Of Business', 'Net PPE Purchase And Sale',
-        'Capital Expenditure Reported', 'Operating Cash Flow',
-        'Change In Working Capital', 'Change In Other Current Assets',
-        'Change In Payable', 'Change In Receivables',
-        'Depreciation And Amortization', 'Net Income From Continuing Operations',
-        
-        # Info fields
-        # 'currentPrice', 'dayHigh', 'dayLow', 'previousClose',
-        # 'dividendRate', 'marketCap', 'fiftyTwoWeekLow', 'fiftyTwoWeekHigh',
-        # 'fiftyDayAverage', 'twoHundredDayAverage', 'regularMarketPrice',
-        'bookValue','totalCash','totalDebt', 'grossProfits',
-        
-        # Quarterly fields
-        'Pretax Income', 'Net Income Continuous Operations',
-        'Basic EPS', 'Net Interest Income', 'Reconciled Cost Of Revenue',
-        'Reconciled Depreciation', 'Total Unusual Items Excluding Goodwill',
-        'Normalized EBITDA'
-    ]
-    
     def convert_nested_data(obj):
         """Recursively convert financial values in nested dictionaries"""
         if isinstance(obj, dict):
             converted = {}
             for key, value in obj.items():
-                if key in financial_fields:
+                if key in MONETARY_FIELDS:
                     converted[key] = convert_financial_value(value, exchange_rate)
                 else:
                     converted[key] = convert_nested_data(value)
@@ -196,417 +908,1534 @@ def convert_financial_data(data, exchange_rate):
     
     return convert_nested_data(data)
 
+# Price command output field -> field of the lightweight quote endpoint
+PRICE_QUOTE_FIELDS = {
+    'currentPrice': 'regularMarketPrice',
+    'dayHigh': 'regularMarketDayHigh',
+    'dayLow': 'regularMarketDayLow',
+    'fiftyTwoWeekHigh': 'fiftyTwoWeekHigh',
+    'fiftyTwoWeekLow': 'fiftyTwoWeekLow',
+    'previousClose': 'regularMarketPreviousClose',
+}
+
+@traced('price')
 def get_company_latestPrice(symbol):
+    """
+    Latest price fields for a symbol
+    
+    Served from the multi-symbol quote endpoint (shared and cached with other
+    symbols' price lookups); the much larger Ticker.info payload is only
+    fetched when the quote is missing some of the fields.
+    
+    Args:
+        symbol (str): Stock symbol
+    
+    Returns:
+        str: JSON string with currentPrice, dayHigh, dayLow, fiftyTwoWeekHigh,
+            fiftyTwoWeekLow and previousClose
+    """
     try:
-        company = yf.Ticker(symbol)
-        info = company.info
-        
-        price_info = {
-            'currentPrice': info.get('currentPrice'),
-            'dayHigh': info.get('dayHigh'),
-            'dayLow': info.get('dayLow'),
-            'fiftyTwoWeekHigh': info.get('fiftyTwoWeekHigh'),
-            'fiftyTwoWeekLow': info.get('fiftyTwoWeekLow'),
-            'previousClose': info.get('previousClose')
-        }
-        return json.dumps(price_info)
+        with stage('fetch'):
+            try:
+                quote = fetch_quotes([symbol]).get(symbol.upper()) or {}
+            except Exception as e:
+                print(f"Quote request failed for {symbol}, falling back to info: {str(e)}", file=sys.stderr)
+                quote = {}
+            
+            price_info = {field: quote.get(source) for field, source in PRICE_QUOTE_FIELDS.items()}
+            missing = [field for field, value in price_info.items() if value is None]
+            if missing:
+                info = fetch_dataset(symbol, 'info')
+                for field in missing:
+                    price_info[field] = info.get(field)
+        with stage('json_dumps'):
+            return to_json(price_info)
     except Exception as e:
         return json.dumps({"error": str(e)})
 
-def get_company_financials(symbol):
-    try:
-        # Check if currency conversion is needed
-        needs_conversion = should_convert_currency(symbol)
-        exchange_rate = None
-        
-        if needs_conversion:
-            exchange_rate = get_usd_to_inr_rate()
-            if not exchange_rate:
-                print(f"Warning: Could not fetch exchange rate for {symbol}. Data will remain in USD.", file=sys.stderr)
-        
-        # Fetch company data
-        company = yf.Ticker(symbol)
-        
-        # Get different types of financial data
-        data = {
-            'income_statement': company.income_stmt,
-            'balance_sheet': company.balance_sheet,
-            'cash_flow': company.cash_flow,
-            'info': company.info
-        }
-        
-        # Define key fields to extract
-        key_fields = {
-            'income_statement': [
-                'Tax Rate For Calcs',
-                'Net Income From Continuing Operation Net Minority Interest',
-                'Reconciled Depreciation',
-                'EBITDA',
-                'EBIT',
-                'Interest Expense',
-                'Interest Income',
-                'Net Income From Continuing And Discontinued Operation',
-                'Diluted Average Shares',
-                'Basic Average Shares',
-                'Diluted EPS',
-                'Basic EPS',
-                'Net Income Common Stockholders',
-                'Net Income',
-                'Net Income Including Noncontrolling Interests',
-                'Tax Provision',
-                'Pretax Income',
-                'Operating Income',
-                'Operating Expense',
-                'Depreciation And Amortization In Income Statement',
-                'Amortization',
-                'Depreciation Income Statement',
-                'Selling General And Administration',
-                'Selling And Marketing Expense',
-                'General And Administrative Expense',
-                'Gross Profit',
-                'Cost Of Revenue',
-                'Total Revenue',
-                'Operating Revenue'
-            ],
-            'balance_sheet': [
-                'Share Issued',
-                'Net Debt',
-                'Total Debt',
-                'Tangible Book Value',
-                'Working Capital',
-                'Net Tangible Assets',
-                'Capital Lease Obligations',
-                'Common Stock Equity',
-                'Stockholders Equity',
-                'Other Equity Interest',
-                'Retained Earnings',
-                'Total Liabilities Net Minority Interest',
-                'Other Non Current Liabilities',
-                'Non Current Deferred Liabilities',
-                'Long Term Debt And Capital Lease Obligation',
-                'Long Term Debt',
-                'Long Term Provisions',
-                'Current Liabilities',
-                'Current Debt And Capital Lease Obligation',
-                'Current Debt',
-                'Payables',
-                'Dividends Payable',
-                'Total Tax Payable',
-                'Accounts Payable',
-                'Total Assets',
-                'Total Non Current Assets',
-                'Other Non Current Assets',
-                'Goodwill And Other Intangible Assets',
-                'Other Intangible Assets',
-                'Available For Sale Securities',
-                'Trading Securities',
-                'Goodwill',
-                'Net PPE',
-                'Current Assets',
-                'Other Current Assets',
-                'Inventory',
-                'Other Receivables',
-                'Taxes Receivable',
-                'Accounts Receivable',
-                'Gross Accounts Receivable',
-                'Cash Cash Equivalents And Short Term Investments',
-                'Other Short Term Investments',
-                'Cash And Cash Equivalents',
-                'Cash Equivalents'
-            ],
-            'cash_flow': [
-                'Free Cash Flow',
-                'Repayment Of Debt',
-                'Issuance Of Debt',
-                'Capital Expenditure',
-                'Changes In Cash',
-                'Financing Cash Flow',
-                'Cash Dividends Paid',
-                'Long Term Debt Payments',
-                'Sale Of Investment',
-                'Purchase Of Investment',
-                'Net Business Purchase And Sale',
-                'Sale Of Business',
-                'Purchase Of Business',
-                'Net PPE Purchase And Sale',
-                'Capital Expenditure Reported',
-                'Operating Cash Flow',
-                'Change In Working Capital',
-                'Change In Other Current Assets',
-                'Change In Payable',
-                'Change In Receivables',
-                'Depreciation And Amortization',
-                'Net Income From Continuing Operations',
-           ],
-            'info': [
-                'website',
-                'industry',
-                'longBusinessSummary',
-                'fullTimeEmployees',
-                'previousClose',
-                'open',
-                'dayLow',
-                'dayHigh',
-                'dividendRate',
-                'dividendYield',
-                'payoutRatio', 
-                'beta',
-                'volume',
-                'marketCap',
-                'fiftyTwoWeekLow',
-                'fiftyTwoWeekHigh',
-                'fiftyDayAverage',
-                'twoHundredDayAverage',
-                'currency',
-                'sharesOutstanding',
-                'heldPercentInsiders',
-                'heldPercentInstitutions',
-                'bookValue',
-                'priceToBook',
-                'trailingEps',
-                'forwardEps',
-                'lastSplitFactor',
-                'lastSplitDate',
-                'lastDividendDate',
-                'quoteType',
-                'currentPrice',
-                'recommendationKey',
-                'totalCash',
-                'totalDebt',
-                'quickRatio',
-                'currentRatio',
-                'debtToEquity',
-                'returnOnAssets',
-                'returnOnEquity',
-                'grossProfits',
-                'earningsGrowth',
-                'revenueGrowth',
-                'grossMargins',
-                'ebitdaMargins',
-                'operatingMargins',
-                'financialCurrency',
-                'shortName',
-                'regularMarketPrice',
-                'fullExchangeName',
-                'epsCurrentYear',
-                'priceEpsCurrentYear',
-                'fiftyDayAverageChange',]
-        }
-
-        # Convert each DataFrame to dict and handle special types
-        result = {}
-        for key, value in data.items():
-            if isinstance(value, pd.DataFrame) and key in key_fields:
-                # Convert DataFrame to dict and filter only desired fields
-                df_dict = value.to_dict()
-                filtered_data = {
-                    str(k): {
-                        str(inner_k): serialize_value(inner_v)
-                        for inner_k, inner_v in v.items()
-                        if inner_k in key_fields[key]
-                    }
-                    for k, v in df_dict.items()
-                }
-                result[key] = filtered_data
-            elif isinstance(value, dict) and key in key_fields:
-                # Handle info dict with filtering
-                result[key] = {
-                    k: serialize_value(v, key=k)
-                    for k, v in value.items()
-                    if k in key_fields[key]  # Only include fields that are in key_fields
-                }
-            else:
-                result[key] = value
-        
-        # Apply currency conversion if needed
-        if needs_conversion and exchange_rate:
-            print(f"Converting financial data for {symbol} from USD to INR using rate: {exchange_rate}", file=sys.stderr)
-            result = convert_financial_data(result, exchange_rate)
-            # Add conversion metadata
-            result['currency_conversion'] = {
-                'applied': True,
-                'from_currency': 'USD',
-                'to_currency': 'INR',
-                'exchange_rate': exchange_rate,
-                'conversion_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-        else:
-            result['currency_conversion'] = {
-                'applied': False,
-                'reason': 'No conversion needed' if not needs_conversion else f'Exchange rate not available'
-            }
-        
-        return json.dumps(result)
-    except Exception as e:
-        return json.dumps({"error": str(e)})
+# Output key -> yf.Ticker dataset used by get_company_financials
+FINANCIALS_DATASETS = {
+    'income_statement': 'income_stmt',
+    'balance_sheet': 'balance_sheet',
+    'cash_flow': 'cash_flow',
+    'info': 'info',
+}
 
-def get_company_quarterly_financials(symbol):
+def parse_field_projection(spec):
     """
-    Extract quarterly income statement data for the latest 4 quarters with specific fields
+    Parse a field projection such as "info.marketCap,income_statement.EBITDA".
+    A bare section name (or "section.*") keeps that section's default fields.
     
     Args:
-        symbol (str): Stock symbol (e.g., 'AAPL', 'INFY.NS')
+        spec: Comma-separated string or list of "section.field" entries
     
     Returns:
-        str: JSON string containing quarterly financial data
+        dict: Section -> list of fields, or None for the default fields, in
+            the order the sections were first requested
     """
-    try:
-        # Check if currency conversion is needed
-        needs_conversion = should_convert_currency(symbol)
-        exchange_rate = None
-        
-        if needs_conversion:
-            exchange_rate = get_usd_to_inr_rate()
-            if not exchange_rate:
-                print(f"Warning: Could not fetch exchange rate for {symbol}. Data will remain in USD.", file=sys.stderr)
-        
-        # Fetch company data
-        company = yf.Ticker(symbol)
-        
-        # Get quarterly income statement data
-        quarterly_income = company.quarterly_income_stmt
-        
-        if quarterly_income.empty:
-            return json.dumps({"error": "No quarterly income statement data available"})
-        
-        # Define the specific fields to extract
-        target_fields = [
-            'Total Revenue',
-            'Cost Of Revenue', 
-            'Gross Profit',
-            'Selling General And Administration',
-            'Depreciation And Amortization In Income Statement',
-            'Operating Expense',
-            'Other Operating Expense',
-            'Operating Income',
-            'Pretax Income',
-            'Tax Provision',
-            'Net Income Continuous Operations',
-            'Net Income Including Noncontrolling Interests',
-            'Net Income Common Stockholders',
+    items = spec.split(',') if isinstance(spec, str) else list(spec)
+    projection = {}
+    for item in filter(None, (str(item).strip() for item in items)):
+        section, _, field = item.partition('.')
+        if section not in FINANCIALS_DATASETS:
+            raise ValueError(f"Unknown section in field projection: {section} "
+                             f"(expected one of {', '.join(FINANCIALS_DATASETS)})")
+        if not field or field == '*':
+            projection[section] = None
+        elif section not in projection or projection[section] is not None:
+            projection.setdefault(section, []).append(field)
+    if not projection:
+        raise ValueError("Field projection is empty")
+    return projection
+
+def plan_financials(symbol, parallel=None, fields=None, layout='records'):
+    """
+    The I/O half of get_company_financials: fetch the datasets and look up
+    the exchange rate. Everything it returns can be pickled, so batches can
+    hand the CPU-bound render_financials to a worker process.
+    
+    Returns:
+        tuple: Arguments for render_financials
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout} (expected one of {', '.join(LAYOUTS)})")
+    projection = parse_field_projection(fields) if fields else None
+    sections = list(projection) if projection else list(FINANCIALS_DATASETS)
+    datasets = [FINANCIALS_DATASETS[key] for key in sections]
+    if conversion_configured(symbol):
+        # The symbol's currencies are needed to plan the conversion
+        datasets = datasets + ['currencies']
+    
+    # Get different types of financial data
+    with stage('fetch'):
+        fetched = fetch_datasets(symbol, datasets, parallel=parallel)
+    data = {key: fetched[FINANCIALS_DATASETS[key]] for key in sections}
+    
+    failures = [value for value in data.values() if isinstance(value, Exception)]
+    if len(failures) == len(data):
+        raise failures[0]
+    
+    # Define key fields to extract
+    key_fields = {
+        'income_statement': [
+            'Tax Rate For Calcs',
+            'Net Income From Continuing Operation Net Minority Interest',
+            'Reconciled Depreciation',
+            'EBITDA',
+            'EBIT',
+            'Interest Expense',
+            'Interest Income',
+            'Net Income From Continuing And Discontinued Operation',
+            'Diluted Average Shares',
             'Basic Average Shares',
+            'Diluted EPS',
             'Basic EPS',
-            'Net Income From Continuing And Discontinued Operation',
-            'Interest Expense',
-            'Net Interest Income',
-            'EBIT',
-            'EBITDA',
-            'Reconciled Cost Of Revenue',
-            'Reconciled Depreciation',
-            'Net Income From Continuing Operation Net Minority Interest',
-            'Total Unusual Items Excluding Goodwill',
-            'Normalized EBITDA'
+            'Net Income Common Stockholders',
+            'Net Income',
+            'Net Income Including Noncontrolling Interests',
+            'Tax Provision',
+            'Pretax Income',
+            'Operating Income',
+            'Operating Expense',
+            'Depreciation And Amortization In Income Statement',
+            'Amortization',
+            'Depreciation Income Statement',
+            'Selling General And Administration',
+            'Selling And Marketing Expense',
+            'General And Administrative Expense',
+            'Gross Profit',
+            'Cost Of Revenue',
+            'Total Revenue',
+            'Operating Revenue'
+        ],
+        'balance_sheet': [
+            'Share Issued',
+            'Net Debt',
+            'Total Debt',
+            'Tangible Book Value',
+            'Working Capital',
+            'Net Tangible Assets',
+            'Capital Lease Obligations',
+            'Common Stock Equity',
+            'Stockholders Equity',
+            'Other Equity Interest',
+            'Retained Earnings',
+            'Total Liabilities Net Minority Interest',
+            'Other Non Current Liabilities',
+            'Non Current Deferred Liabilities',
+            'Long Term Debt And Capital Lease Obligation',
+            'Long Term Debt',
+            'Long Term Provisions',
+            'Current Liabilities',
+            'Current Debt And Capital Lease Obligation',
+            'Current Debt',
+            'Payables',
+            'Dividends Payable',
+            'Total Tax Payable',
+            'Accounts Payable',
+            'Total Assets',
+            'Total Non Current Assets',
+            'Other Non Current Assets',
+            'Goodwill And Other Intangible Assets',
+            'Other Intangible Assets',
+            'Available For Sale Securities',
+            'Trading Securities',
+            'Goodwill',
+            'Net PPE',
+            'Current Assets',
+            'Other Current Assets',
+            'Inventory',
+            'Other Receivables',
+            'Taxes Receivable',
+            'Accounts Receivable',
+            'Gross Accounts Receivable',
+            'Cash Cash Equivalents And Short Term Investments',
+            'Other Short Term Investments',
+            'Cash And Cash Equivalents',
+            'Cash Equivalents'
+        ],
+        'cash_flow': [
+            'Free Cash Flow',
+            'Repayment Of Debt',
+            'Issuance Of Debt',
+            'Capital Expenditure',
+            'Changes In Cash',
+            'Financing Cash Flow',
+            'Cash Dividends Paid',
+            'Long Term Debt Payments',
+            'Sale Of Investment',
+            'Purchase Of Investment',
+            'Net Business Purchase And Sale',
+            'Sale Of Business',
+            'Purchase Of Business',
+            'Net PPE Purchase And Sale',
+            'Capital Expenditure Reported',
+            'Operating Cash Flow',
+            'Change In Working Capital',
+            'Change In Other Current Assets',
+            'Change In Payable',
+            'Change In Receivables',
+            'Depreciation And Amortization',
+            'Net Income From Continuing Operations',
+       ],
+        'info': [
+            'website',
+            'industry',
+            'longBusinessSummary',
+            'fullTimeEmployees',
+            'previousClose',
+            'open',
+            'dayLow',
+            'dayHigh',
+            'dividendRate',
+            'dividendYield',
+            'payoutRatio', 
+            'beta',
+            'volume',
+            'marketCap',
+            'fiftyTwoWeekLow',
+            'fiftyTwoWeekHigh',
+            'fiftyDayAverage',
+            'twoHundredDayAverage',
+            'currency',
+            'sharesOutstanding',
+            'heldPercentInsiders',
+            'heldPercentInstitutions',
+            'bookValue',
+            'priceToBook',
+            'trailingEps',
+            'forwardEps',
+            'lastSplitFactor',
+            'lastSplitDate',
+            'lastDividendDate',
+            'quoteType',
+            'currentPrice',
+            'recommendationKey',
+            'totalCash',
+            'totalDebt',
+            'quickRatio',
+            'currentRatio',
+            'debtToEquity',
+            'returnOnAssets',
+            'returnOnEquity',
+            'grossProfits',
+            'earningsGrowth',
+            'revenueGrowth',
+            'grossMargins',
+            'ebitdaMargins',
+            'operatingMargins',
+            'financialCurrency',
+            'shortName',
+            'regularMarketPrice',
+            'fullExchangeName',
+            'epsCurrentYear',
+            'priceEpsCurrentYear',
+            'fiftyDayAverageChange',]
+    }
+
+    if projection:
+        key_fields = {
+            key: requested if requested is not None else key_fields[key]
+            for key, requested in projection.items()
+        }
+    
+    # Check if currency conversion is needed
+    currencies = fetched.get('currencies') if isinstance(fetched.get('currencies'), dict) else None
+    with stage('fx'):
+        exchange_rate, conversion = plan_currency_conversion(symbol, currencies)
+    
+    for key, value in data.items():
+        if isinstance(value, Exception):
+            # Exceptions raised inside upstream libraries don't always survive pickling
+            data[key] = RuntimeError(str(value))
+        elif isinstance(value, pd.DataFrame) and key in key_fields:
+            # Select the wanted rows here, in both modes, so a worker process
+            # is only sent the rows render_financials serializes
+            with stage('filter'):
+                data[key] = value[value.index.isin(key_fields[key])]
+    return symbol, data, key_fields, exchange_rate, conversion, layout
+
+def render_financials(symbol, data, key_fields, exchange_rate, conversion, layout='records'):
+    """
+    The CPU half of get_company_financials: filter, convert and serialize
+    the datasets prepared by plan_financials
+    
+    Returns:
+        str: JSON string
+    """
+    # Convert each DataFrame to dict and handle special types
+    result = {}
+    for key, value in data.items():
+        if isinstance(value, Exception):
+            print(f"Failed to fetch {key} for {symbol}: {str(value)}", file=sys.stderr)
+            result[key] = {'error': str(value)}
+        elif isinstance(value, pd.DataFrame) and key in key_fields:
+            # plan_financials already selected the rows; convert currency and
+            # serialize column by column
+            result[key] = serialize_statement(value, None, exchange_rate=exchange_rate, layout=layout)
+        elif isinstance(value, dict) and key in key_fields:
+            # Handle info dict with filtering; to_json takes care of
+            # NaN, timestamps and NumPy scalars in the values
+            with stage('serialize'):
+                wanted = set(key_fields[key])
+                info_fields = {k: v for k, v in value.items() if k in wanted}
+                if isinstance(info_fields.get('longBusinessSummary'), str):
+                    info_fields['longBusinessSummary'] = truncate_summary(info_fields['longBusinessSummary'])
+            with stage('convert'):
+                result[key] = convert_info_fields(info_fields, exchange_rate)
+        else:
+            result[key] = value
+    
+    result['currency_conversion'] = conversion
+    
+    with stage('json_dumps'):
+        return to_json(result)
+
+@traced('financials')
+def get_company_financials(symbol, parallel=None, fields=None, layout='records'):
+    """
+    Extract annual statements and key info fields for a symbol
+    
+    Args:
+        symbol (str): Stock symbol (e.g., 'AAPL', 'INFY.NS')
+        parallel (bool): Fetch the four datasets concurrently (defaults to PARALLEL_FETCH)
+        fields: Optional projection, e.g. "info.marketCap,income_statement.EBITDA"
+            (see parse_field_projection). Only the requested sections are
+            fetched and only the requested fields are returned.
+        layout (str): Statement layout, 'records' or 'columnar' (see LAYOUTS)
+    
+    Returns:
+        str: JSON string; a dataset that failed to load is reported as
+            {"error": ...} under its own key
+    """
+    try:
+        return render_financials(*plan_financials(symbol, parallel=parallel, fields=fields, layout=layout))
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+# Quarterly income statement fields extracted by get_company_quarterly_financials
+QUARTERLY_TARGET_FIELDS = [
+    'Total Revenue',
+    'Cost Of Revenue',
+    'Gross Profit',
+    'Selling General And Administration',
+    'Depreciation And Amortization In Income Statement',
+    'Operating Expense',
+    'Other Operating Expense',
+    'Operating Income',
+    'Pretax Income',
+    'Tax Provision',
+    'Net Income Continuous Operations',
+    'Net Income Including Noncontrolling Interests',
+    'Net Income Common Stockholders',
+    'Basic Average Shares',
+    'Basic EPS',
+    'Net Income From Continuing And Discontinued Operation',
+    'Interest Expense',
+    'Net Interest Income',
+    'EBIT',
+    'EBITDA',
+    'Reconciled Cost Of Revenue',
+    'Reconciled Depreciation',
+    'Net Income From Continuing Operation Net Minority Interest',
+    'Total Unusual Items Excluding Goodwill',
+    'Normalized EBITDA'
+]
+
+def _normalize_field_name(name):
+    return str(name).lower().replace(' ', '').replace('_', '')
+
+_QUARTERLY_TARGET_NAMES = [_normalize_field_name(field) for field in QUARTERLY_TARGET_FIELDS]
+
+@functools.lru_cache(maxsize=256)
+def _field_index(labels):
+    """
+    Map normalized field names to the position of the first matching row label.
+    Cached per distinct statement index, which rarely changes between calls.
+    """
+    index = {}
+    for position, label in enumerate(labels):
+        index.setdefault(_normalize_field_name(label), position)
+    return index
+
+def plan_quarterly_financials(symbol, quarters=4, layout='records'):
+    """
+    The I/O half of get_company_quarterly_financials (see plan_financials)
+    
+    Returns:
+        tuple: Arguments for render_quarterly_financials
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout} (expected one of {', '.join(LAYOUTS)})")
+    # Get quarterly income statement data, plus the symbol's currencies when
+    # it is converted
+    datasets = ['quarterly_income_stmt'] + (['currencies'] if conversion_configured(symbol) else [])
+    with stage('fetch'):
+        fetched = fetch_datasets(symbol, datasets)
+    quarterly_income = fetched['quarterly_income_stmt']
+    if isinstance(quarterly_income, Exception):
+        raise quarterly_income
+    
+    if quarterly_income.empty:
+        raise ValueError("No quarterly income statement data available")
+    
+    # Get the latest quarters (columns are sorted by date, latest first)
+    latest = quarterly_income.iloc[:, :max(1, int(quarters))]
+    
+    # Match target fields to rows (case-insensitive and flexible matching)
+    # through the precomputed index, then slice them all at once
+    with stage('filter'):
+        field_index = _field_index(tuple(quarterly_income.index))
+        matches = [
+            (field, field_index[name])
+            for field, name in zip(QUARTERLY_TARGET_FIELDS, _QUARTERLY_TARGET_NAMES)
+            if name in field_index
         ]
+        selected = latest.iloc[[position for _, position in matches]]
+        selected.index = [field for field, _ in matches]
+        # Fields the statement doesn't have come back as None
+        selected = selected.reindex(QUARTERLY_TARGET_FIELDS)
+    
+    # Check if currency conversion is needed
+    currencies = fetched.get('currencies') if isinstance(fetched.get('currencies'), dict) else None
+    with stage('fx'):
+        exchange_rate, conversion = plan_currency_conversion(symbol, currencies)
+    return symbol, selected, exchange_rate, conversion, layout
+
+def render_quarterly_financials(symbol, selected, exchange_rate, conversion, layout='records'):
+    """
+    The CPU half of get_company_quarterly_financials: convert and serialize
+    the target fields selected by plan_quarterly_financials
+    
+    Returns:
+        str: JSON string
+    """
+    # Convert currency and quarter timestamps to strings
+    filtered_data = serialize_statement(
+        selected, None,
+        period_key=lambda quarter: quarter.strftime('%Y-%m-%d') if hasattr(quarter, 'strftime') else str(quarter),
+        exchange_rate=exchange_rate,
+        layout=layout
+    )
+    
+    # Prepare result with metadata
+    result = {
+        'symbol': symbol,
+        'data_type': 'quarterly_income_statement',
+        'quarters_count': len(selected.columns),
+        'fetch_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'quarterly_data': filtered_data
+    }
+    
+    result['currency_conversion'] = conversion
+    
+    with stage('json_dumps'):
+        return to_json(result)
+
+@traced('quarterly')
+def get_company_quarterly_financials(symbol, quarters=4, layout='records'):
+    """
+    Extract quarterly income statement data for the latest quarters with specific fields
+    
+    Args:
+        symbol (str): Stock symbol (e.g., 'AAPL', 'INFY.NS')
+        quarters (int): Number of most recent quarters to return
+        layout (str): Layout of quarterly_data, 'records' or 'columnar' (see LAYOUTS)
+    
+    Returns:
+        str: JSON string containing quarterly financial data
+    """
+    try:
+        return render_quarterly_financials(*plan_quarterly_financials(symbol, quarters=quarters, layout=layout))
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+# Statements the derived metrics are computed from
+DERIVED_METRICS_DATASETS = ['income_stmt', 'balance_sheet', 'cash_flow', 'quarterly_income_stmt', 'info']
+
+_metrics_memo = None
+_metrics_memo_lock = threading.Lock()
+
+def _get_metrics_memo():
+    global _metrics_memo
+    with _metrics_memo_lock:
+        if _metrics_memo is None:
+            _metrics_memo = derived_metrics.MetricsMemo(
+                max_entries=int(os.environ.get('YFINANCE_CACHE_MAX_ENTRIES', '1024')))
+        return _metrics_memo
+
+def _date_key(period):
+    return period.strftime('%Y-%m-%d') if hasattr(period, 'strftime') else str(period)
+
+def _fcf_yield(symbol, info, annual):
+    """Latest annual free cash flow over the current market cap, in the listing currency"""
+    market_cap = info.get('marketCap') if info else None
+    if not market_cap or annual.empty or 'Free Cash Flow' not in annual.index:
+        return {'marketCap': market_cap, 'fcfYield': None}
+    free_cash_flow = annual.loc['Free Cash Flow'].dropna()
+    if free_cash_flow.empty:
+        return {'marketCap': market_cap, 'fcfYield': None}
+    from_currency = _major_currency(info.get('financialCurrency'))
+    to_currency = _major_currency(info.get('currency'))
+    rate = 1.0
+    if from_currency and to_currency and from_currency != to_currency:
+        rate, _ = get_exchange_rate(from_currency, to_currency)
+    return {
+        'marketCap': market_cap,
+        'fcfPeriod': _date_key(free_cash_flow.index[0]),
+        'fcfYield': round(float(free_cash_flow.iloc[0]) * rate / market_cap, 6) if rate else None,
+    }
+
+@traced('derived')
+def get_company_derived_metrics(symbol, layout='records'):
+    """
+    Margins, growth, leverage, TTM figures and FCF yield computed from the
+    cached statements
+    
+    The statement metrics are memoized per symbol and only recomputed when
+    one of the statements gains a new period; FCF yield uses the current
+    market cap on every call.
+    
+    Args:
+        symbol (str): Stock symbol (e.g., 'AAPL', 'INFY.NS')
+        layout (str): 'records' or 'columnar' (see LAYOUTS)
+    
+    Returns:
+        str: JSON string with 'annual', 'quarterly' and 'ttm' metrics by
+            period, 'valuation' and 'currency_conversion'. Ratios are
+            fractions (0.25 = 25%); amounts are converted like the statements.
+    """
+    try:
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout: {layout} (expected one of {', '.join(LAYOUTS)})")
+        with stage('fetch'):
+            fetched = fetch_datasets(symbol, DERIVED_METRICS_DATASETS)
+        statements = [
+            value if isinstance(value, pd.DataFrame) else None
+            for value in (fetched[dataset] for dataset in DERIVED_METRICS_DATASETS[:-1])
+        ]
+        income, balance, cash_flow, quarterly = statements
+        if income is None and quarterly is None:
+            failure = fetched['income_stmt']
+            raise failure if isinstance(failure, Exception) else ValueError("No income statement data available")
         
-        # Get the latest 4 quarters (columns are sorted by date, latest first)
-        latest_quarters = quarterly_income.columns[:4] if len(quarterly_income.columns) >= 4 else quarterly_income.columns
+        def compute():
+            return {
+                'annual': derived_metrics.annual_metrics(income, balance, cash_flow),
+                'quarterly': derived_metrics.quarterly_metrics(quarterly),
+                'ttm': derived_metrics.ttm_metrics(quarterly, balance),
+            }
         
-        # Filter data for target fields and latest quarters
-        filtered_data = {}
+        with stage('compute'):
+            computed = _get_metrics_memo().get_or_compute(
+                symbol, derived_metrics.period_signature(*statements), compute)
         
-        for quarter in latest_quarters:
-            quarter_data = {}
-            for field in target_fields:
-                # Check if field exists in the data (case-insensitive and flexible matching)
-                matching_field = None
-                for available_field in quarterly_income.index:
-                    if field.lower().replace(' ', '').replace('_', '') == available_field.lower().replace(' ', '').replace('_', ''):
-                        matching_field = available_field
-                        break
-                
-                if matching_field is not None:
-                    value = quarterly_income.loc[matching_field, quarter]
-                    quarter_data[field] = serialize_value(value)
-                else:
-                    quarter_data[field] = None
-            
-            # Convert quarter timestamp to string
-            quarter_str = quarter.strftime('%Y-%m-%d') if hasattr(quarter, 'strftime') else str(quarter)
-            filtered_data[quarter_str] = quarter_data
+        info = fetched['info'] if isinstance(fetched['info'], dict) else None
+        with stage('fx'):
+            exchange_rate, conversion = plan_currency_conversion(symbol, info)
         
-        # Prepare result with metadata
-        result = {
-            'symbol': symbol,
-            'data_type': 'quarterly_income_statement',
-            'quarters_count': len(latest_quarters),
-            'fetch_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'quarterly_data': filtered_data
-        }
+        result = {'symbol': symbol}
+        for key, frame in computed.items():
+            result[key] = serialize_statement(frame, None, period_key=_date_key,
+                                              exchange_rate=exchange_rate, layout=layout) if not frame.empty else {}
+        result['valuation'] = _fcf_yield(symbol, info, computed['annual'])
+        result['currency_conversion'] = conversion
         
-        # Apply currency conversion if needed
-        if needs_conversion and exchange_rate:
-            print(f"Converting quarterly financial data for {symbol} from USD to INR using rate: {exchange_rate}", file=sys.stderr)
-            result = convert_financial_data(result, exchange_rate)
-            # Add conversion metadata
-            result['currency_conversion'] = {
-                'applied': True,
-                'from_currency': 'USD',
-                'to_currency': 'INR',
-                'exchange_rate': exchange_rate,
-                'conversion_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
+        with stage('json_dumps'):
+            return to_json(result)
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+def parse_index_list(spec):
+    """
+    Parse an index list given as "NAME=SYMBOL,NAME=SYMBOL" (a bare SYMBOL uses
+    the symbol as its name), or pass a dict/list through.
+    
+    Returns:
+        dict: Index display name -> Yahoo symbol
+    """
+    if isinstance(spec, dict):
+        return dict(spec)
+    if isinstance(spec, (list, tuple)):
+        return {symbol: symbol for symbol in spec}
+    indices = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, symbol = item.rpartition('=')
+        indices[name.strip() or symbol.strip()] = symbol.strip()
+    return indices
+
+# Index display name -> Yahoo symbol for the homepage snapshot. Override with
+# e.g. YFINANCE_INDICES="NIFTY 50=^NSEI,NASDAQ=^IXIC".
+STOCK_INDICES = parse_index_list(os.environ.get('YFINANCE_INDICES', '')) or {
+    "NIFTY 50": "^NSEI",
+    "NIFTY BANK": "^NSEBANK",
+    "NIFTY IT": "^CNXIT",
+    "NIFTY MIDCAP 50": "^NSEMDCP50",
+    "BSE SENSEX": "^BSESN",
+    "NYSE": "^NYA",
+    "NASDAQ": "^IXIC"
+}
+
+INDEX_QUOTE_FIELDS = [
+    'shortName',
+    'fullExchangeName',
+    'regularMarketPrice',
+    'regularMarketPreviousClose',
+    'regularMarketOpen',
+    'regularMarketDayLow',
+    'regularMarketDayHigh',
+    'fiftyTwoWeekLow',
+    'fiftyTwoWeekHigh',
+    'fiftyDayAverage',
+    'twoHundredDayAverage',
+]
+
+def _index_entry(name, symbol, quote):
+    index_data = {'name': name, 'symbol': symbol}
+    for field in INDEX_QUOTE_FIELDS:
+        index_data[field] = quote.get(field)
+    return index_data
+
+def _fetch_index_quote(name, symbol):
+    try:
+        return _index_entry(name, symbol, fetch_dataset(symbol, 'info'))
+    except Exception as e:
+        return {'name': name, 'symbol': symbol, 'error': str(e)}
+
+def iter_latest_stock_indices(max_workers=8, indices=None):
+    """
+    Yield each index's quote dict as soon as it is available
+    
+    All indices are first requested in one multi-symbol quote call. Any index
+    that call doesn't return is fetched from Ticker.info on a bounded pool,
+    so those arrive in completion order and failures become error entries.
+    
+    Args:
+        max_workers (int): Concurrency for the per-index fallback
+        indices (dict): Index display name -> symbol (defaults to STOCK_INDICES)
+    """
+    indices = indices or STOCK_INDICES
+    try:
+        quotes = fetch_quotes(list(indices.values()))
+    except Exception as e:
+        print(f"Batched index quote request failed, fetching indices individually: {str(e)}", file=sys.stderr)
+        quotes = {}
+    
+    fallback = {}
+    for name, symbol in indices.items():
+        if symbol.upper() in quotes:
+            yield _index_entry(name, symbol, quotes[symbol.upper()])
         else:
-            result['currency_conversion'] = {
-                'applied': False,
-                'reason': 'No conversion needed' if not needs_conversion else f'Exchange rate not available'
+            fallback[name] = symbol
+    if not fallback:
+        return
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(fallback)))) as executor:
+        futures = [executor.submit(bind(_fetch_index_quote), name, symbol) for name, symbol in fallback.items()]
+        for future in as_completed(futures):
+            yield future.result()
+
+@traced('indices')
+def get_latest_stock_indices(indices=None):
+    """
+    Fetch latest quotes for major stock indices (NSE, BSE, NYSE, NASDAQ) and extract key fields.
+    Returns a list of dicts, one per index.
+    
+    Args:
+        indices: Index display name -> symbol mapping, or a "NAME=SYMBOL,..."
+            string (defaults to STOCK_INDICES)
+    """
+    indices = parse_index_list(indices) if indices else STOCK_INDICES
+    with stage('fetch'):
+        by_name = {index_data['name']: index_data for index_data in iter_latest_stock_indices(indices=indices)}
+    return [by_name[name] for name in indices]
+
+@traced('history')
+def get_price_history(symbol, start=None, end=None, fields=None):
+    """
+    Daily OHLCV bars for a symbol, served from the memory-mapped store after
+    fetching only the bars it is missing
+    
+    Args:
+        symbol (str): Stock symbol
+        start: First date, e.g. '2024-01-01' (defaults to everything stored,
+            YFINANCE_HISTORY_YEARS on a symbol's first request)
+        end: Last date, inclusive (defaults to the latest bar)
+        fields: Columns to return, e.g. "close,volume" (defaults to all of
+            price_history.FIELDS)
+    
+    Returns:
+        str: JSON string with a 'date' array and one value array per field
+    """
+    try:
+        columns = [f.strip() for f in (fields.split(',') if isinstance(fields, str) else fields) if f.strip()] \
+            if fields else list(price_history.FIELDS)
+        unknown = [column for column in columns if column not in price_history.FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown history field: {', '.join(unknown)} "
+                             f"(expected some of {', '.join(price_history.FIELDS)})")
+        
+        with stage('fetch'):
+            refresh_history([symbol], start=start)
+        with stage('filter'):
+            bars = _get_history_store().read(symbol, start, end)
+        if bars is None:
+            return json.dumps({"error": f"No price history available for {symbol}"})
+        
+        with stage('serialize'):
+            # The value arrays are views into the mapped files; the encoder
+            # writes them out directly
+            result = {
+                'symbol': symbol,
+                'interval': '1d',
+                'count': len(bars['date']),
+                'date': np.datetime_as_string(bars['date']).tolist(),
             }
+            result.update((column, bars[column]) for column in columns)
+        with stage('json_dumps'):
+            return to_json(result)
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+# Seconds a screener snapshot of a universe is reused before its info
+# fields are reloaded (from the dataset cache, or Yahoo where that expired)
+SCREENER_SNAPSHOT_TTL = float(os.environ.get('YFINANCE_SCREENER_TTL', '300'))
+SCREENER_MAX_SNAPSHOTS = 8
+
+_snapshots = OrderedDict()  # universe -> (built_at, snapshot, errors)
+_snapshots_lock = threading.Lock()
+_snapshot_flights = SingleFlight()
+
+def _build_screener_snapshot(symbols, max_workers):
+    infos, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols)))) as executor:
+        futures = {executor.submit(bind(fetch_dataset), symbol, 'info'): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                info = future.result()
+            except Exception as e:
+                errors[symbol] = str(e)
+                continue
+            if info:
+                infos[symbol] = info
+            else:
+                errors[symbol] = 'No info data available'
+    snapshot = screener.build_snapshot({symbol: infos[symbol] for symbol in symbols if symbol in infos})
+    entry = (time.time(), snapshot, errors)
+    with _snapshots_lock:
+        _snapshots[symbols] = entry
+        _snapshots.move_to_end(symbols)
+        while len(_snapshots) > SCREENER_MAX_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+    return entry
+
+def load_screener_snapshot(symbols, max_workers=16, refresh=False):
+    """
+    Columnar info snapshot of a symbol universe, reused for
+    SCREENER_SNAPSHOT_TTL seconds. A cold snapshot is loaded with concurrent
+    cached info fetches; concurrent callers share one load.
+    
+    Args:
+        symbols (list): Universe symbols
+        max_workers (int): Info fetches in flight while loading
+        refresh (bool): Reload even if the snapshot is still fresh
+    
+    Returns:
+        tuple: (built_at, snapshot DataFrame indexed by symbol, {symbol: error})
+    """
+    key = tuple(symbols)
+    with _snapshots_lock:
+        entry = _snapshots.get(key)
+        if entry is not None and not refresh and time.time() - entry[0] < SCREENER_SNAPSHOT_TTL:
+            _snapshots.move_to_end(key)
+            count('cache_hits')
+            return entry
+    return _snapshot_flights.do(key, _build_screener_snapshot, key, max_workers)
+
+@traced('screen')
+def get_screener(universe, where=None, sort=None, top=50, fields=None, max_workers=16, refresh=False):
+    """
+    Screen a symbol universe on its info fields and return the top matches
+    
+    Args:
+        universe: Symbols as a list, comma-separated string or file path
+        where: Conditions that must all hold, e.g. "marketCap>1e10,debtToEquity<50"
+            (see screener.parse_filters)
+        sort: Sort keys, e.g. "-returnOnEquity,marketCap" ('-' for descending)
+        top (int): Number of matches returned
+        fields: Columns returned per match (defaults to shortName, currency,
+            marketCap and the filtered and sorted fields)
+        max_workers (int): Info fetches in flight while loading the snapshot
+        refresh (bool): Reload the snapshot even if it is still fresh
+    
+    Returns:
+        str: JSON string with 'results' (one object per match, best first),
+            'matched', the universe size and the symbols that failed to load
+    """
+    try:
+        symbols = read_symbol_list(universe or [])
+        if not symbols:
+            raise ValueError("Screener universe is empty")
+        filters = screener.parse_filters(where)
+        sort_keys = screener.parse_sort(sort)
+        columns = [f.strip() for f in (fields.split(',') if isinstance(fields, str) else fields) if f.strip()] if fields else list(dict.fromkeys(
+            ['shortName', 'currency', 'marketCap'] + [f for f, _, _ in filters] + [f for f, _ in sort_keys]))
         
-        return json.dumps(result)
+        with stage('fetch'):
+            built_at, snapshot, errors = load_screener_snapshot(symbols, max_workers=max_workers, refresh=refresh)
+        with stage('filter'):
+            screener.check_fields(snapshot, columns)
+            rows, matched = screener.screen(snapshot, filters, sort_keys, top=int(top) if top is not None else None)
+        with stage('serialize'):
+            results = rows[columns].reset_index().to_dict('records')
         
+        result = {
+            'universe': len(symbols),
+            'loaded': len(snapshot),
+            'matched': matched,
+            'snapshot_age_seconds': round(time.time() - built_at, 1),
+            'results': results,
+            'errors': errors,
+        }
+        with stage('json_dumps'):
+            return to_json(result)
     except Exception as e:
         return json.dumps({"error": str(e)})
 
-def get_latest_stock_indices():
+# Datasets a scheduled warm-up prefetches for every watchlist symbol (quotes
+# are fetched too, in multi-symbol requests); the rolling refresh only
+# renews HOT_DATASETS
+PREFETCH_DATASETS = ['info', 'income_stmt', 'balance_sheet', 'cash_flow', 'quarterly_income_stmt']
+HOT_DATASETS = ['info']
+
+# Seconds statements warmed by a scheduled prefetch stay cached at least, so
+# a warm-up well before the open still serves the opening spike. Quotes and
+# info keep their short TTLs so prices stay fresh; they are only warm when
+# the warm-up runs close to the open or the rolling refresh renews them.
+PREFETCH_TTL = float(os.environ.get('YFINANCE_PREFETCH_TTL', '600'))
+
+# Requests per symbol since the last rolling refresh, to find hot symbols
+_symbol_requests = Counter()
+_symbol_requests_lock = threading.Lock()
+_scheduler = None
+
+def _note_request(symbol):
+    with _symbol_requests_lock:
+        _symbol_requests[symbol.upper()] += 1
+
+def hot_symbols(n):
     """
-    Fetch latest quotes for major stock indices (NSE, BSE, NYSE, NASDAQ) and extract key fields.
-    Returns a list of dicts, one per index.
+    The n most requested symbols. Counts are halved on every call, so the
+    ranking follows recent traffic.
+    """
+    with _symbol_requests_lock:
+        hot = [symbol for symbol, _ in _symbol_requests.most_common(n)]
+        for symbol in list(_symbol_requests):
+            _symbol_requests[symbol] //= 2
+            if not _symbol_requests[symbol]:
+                del _symbol_requests[symbol]
+    return hot
+
+def _prefetch_dataset(symbol, dataset, min_fresh, min_ttl):
+    expires_in = _cache.expires_in(symbol, dataset)
+    if expires_in is not None and expires_in >= min_fresh:
+        return 'warm'
+    _dataset_flights.do((symbol.upper(), dataset), _fetch_and_cache, symbol, dataset, min_ttl)
+    return 'fetched'
+
+def warm_symbols(symbols, datasets=None, quotes=True, max_workers=8, min_fresh=60, ttl=None, reason=None):
+    """
+    Prefetch datasets for many symbols into the cache with bounded
+    concurrency (upstream requests are also throttled by the shared session)
+    
+    Args:
+        symbols (list): Stock symbols
+        datasets (list): Datasets to prefetch (defaults to PREFETCH_DATASETS)
+        quotes (bool): Also refresh quotes with multi-symbol requests
+        max_workers (int): Dataset fetches in flight
+        min_fresh (float): Entries that stay fresh for at least this many more
+            seconds are left alone; the rest are refetched
+        ttl (float): Keep fetched statements cached at least this long,
+            beyond their dataset TTL (quotes and info keep theirs)
+        reason (str): Recorded in the report
+    
+    Returns:
+        dict: Report with per-dataset fetched/warm/failed counts, the share of
+            symbol/dataset pairs cached afterwards ('coverage') and the duration
     """
-    indices = {
-        "NIFTY 50": "^NSEI",
-        "NIFTY BANK": "^NSEBANK",
-        "NIFTY IT": "^CNXIT",
-        "NIFTY MIDCAP 50": "^NSEMDCP50",
-        "BSE SENSEX": "^BSESN",
-        "NYSE": "^NYA",
-        "NASDAQ": "^IXIC"
+    started = time.time()
+    symbols = read_symbol_list(symbols)
+    datasets = PREFETCH_DATASETS if datasets is None else list(datasets)
+    counts = {dataset: {'fetched': 0, 'warm': 0, 'failed': 0} for dataset in datasets}
+    errors = {}
+    
+    if quotes and symbols:
+        counts['quote'] = {'fetched': 0, 'warm': 0, 'failed': 0}
+        stale = [s for s in symbols if (_cache.expires_in(s, 'quote') or 0) < min_fresh]
+        counts['quote']['warm'] = len(symbols) - len(stale)
+        try:
+            fetched = fetch_quotes(stale, refresh=True)
+            counts['quote']['fetched'] = len(fetched)
+            counts['quote']['failed'] = len(stale) - len(fetched)
+        except Exception as e:
+            counts['quote']['failed'] = len(stale)
+            errors['quote'] = str(e)
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(_prefetch_dataset, symbol, dataset, min_fresh,
+                            ttl if dataset in STATEMENT_PERIOD_DAYS else None): (symbol, dataset)
+            for symbol in symbols for dataset in datasets
+        }
+        for future in as_completed(futures):
+            symbol, dataset = futures[future]
+            try:
+                counts[dataset][future.result()] += 1
+            except Exception as e:
+                counts[dataset]['failed'] += 1
+                if len(errors) < 20:
+                    errors[f'{symbol}/{dataset}'] = str(e)
+    
+    coverage = {
+        dataset: round(sum((_cache.expires_in(s, dataset) or -1) > 0 for s in symbols) / len(symbols), 4) if symbols else None
+        for dataset in counts
     }
-    fields = [
-        'shortName',
-        'fullExchangeName',
-        'regularMarketPrice',
-        'regularMarketPreviousClose',
-        'regularMarketOpen',
-        'regularMarketDayLow',
-        'regularMarketDayHigh',
-        'fiftyTwoWeekLow',
-        'fiftyTwoWeekHigh',
-        'fiftyDayAverage',
-        'twoHundredDayAverage',
-    ]
-    results = []
-    for name, symbol in indices.items():
+    return {
+        'reason': reason,
+        'started_at': datetime.fromtimestamp(started).strftime('%Y-%m-%d %H:%M:%S'),
+        'duration_seconds': round(time.time() - started, 2),
+        'symbols': len(symbols),
+        'datasets': counts,
+        'coverage': coverage,
+        'errors': errors,
+    }
+
+def make_prefetch_scheduler(watchlist, schedules, hot_interval=300, hot_count=50, max_workers=8, report=None,
+                            ttl=None):
+    """
+    Build a scheduler that warms the watchlist's datasets at every cron
+    schedule (e.g. "14 9 * * 1-5 Asia/Kolkata" for the NSE open) and renews
+    the quotes and info of the hot symbols every hot_interval seconds.
+    Statements from scheduled warm-ups outlive their dataset TTL by ttl;
+    quotes and info always keep their own short TTL.
+    
+    Args:
+        watchlist: Symbols as a list, comma-separated string or file path;
+            re-read before every warm-up so the file can be edited in place
+        schedules (list): Cron expressions (see prefetch_scheduler.CronSchedule)
+        hot_interval (float): Seconds between rolling refreshes (0 disables them)
+        hot_count (int): Symbols renewed per rolling refresh: the most
+            requested ones, or the start of the watchlist before any requests
+        max_workers (int): Dataset fetches in flight
+        report (callable): Receives every warm-up report
+        ttl (float): Seconds scheduled warm-ups keep statements cached at
+            least (defaults to PREFETCH_TTL)
+    """
+    ttl = PREFETCH_TTL if ttl is None else ttl
+    
+    def warm(reason):
+        return warm_symbols(read_symbol_list(watchlist), max_workers=max_workers, ttl=ttl, reason=reason)
+    
+    def refresh_hot(reason):
+        symbols = hot_symbols(hot_count) or read_symbol_list(watchlist)[:hot_count]
+        return warm_symbols(symbols, datasets=HOT_DATASETS, max_workers=max_workers,
+                            min_fresh=hot_interval, reason=reason)
+    
+    return prefetch_scheduler.PrefetchScheduler(
+        warm, [prefetch_scheduler.CronSchedule(spec) for spec in schedules],
+        refresh_hot=refresh_hot, hot_interval=hot_interval, report=report,
+    )
+
+def get_prefetch_status():
+    """Next scheduled warm-ups and the latest reports of the running scheduler"""
+    if _scheduler is None:
+        return {'running': False}
+    return {
+        'running': True,
+        'next_runs': [{'at': due.isoformat(), 'reason': reason} for due, reason in _scheduler.next_runs()],
+        'hot_interval': _scheduler.hot_interval,
+        'reports': list(_scheduler.reports),
+    }
+
+# Commands understood by the CLI and by --serve requests. Every handler takes
+# the symbol (ignored for the index snapshot) and returns a JSON string.
+COMMANDS = {
+    'financials': get_company_financials,
+    'quarterly': get_company_quarterly_financials,
+    'price': get_company_latestPrice,
+    'derived': get_company_derived_metrics,
+    'history': get_price_history,
+    'indices': lambda symbol=None, indices=None: to_json(get_latest_stock_indices(indices)),
+    'cache_stats': lambda symbol=None: json.dumps(get_cache_stats()),
+    'metrics': lambda symbol=None: json.dumps({'format': 'prometheus', 'text': render_metrics()}),
+    'screen': lambda symbol=None, **options: get_screener(**options),
+    'prefetch_status': lambda symbol=None: json.dumps(get_prefetch_status()),
+}
+
+# Commands that don't operate on a single symbol
+SYMBOL_FREE_COMMANDS = {'indices', 'cache_stats', 'metrics', 'screen', 'prefetch_status'}
+
+# Optional per-command settings forwarded from --serve requests to the handler
+COMMAND_OPTIONS = {
+    'financials': ('fields', 'layout'),
+    'quarterly': ('quarters', 'layout'),
+    'derived': ('layout',),
+    'history': ('start', 'end', 'fields'),
+    'indices': ('indices',),
+    'screen': ('universe', 'where', 'sort', 'top', 'fields', 'refresh'),
+}
+
+def run_command(command, symbol=None, **options):
+    """
+    Dispatch a single extractor command
+    
+    Args:
+        command (str): One of the keys of COMMANDS
+        symbol (str): Stock symbol, required unless the command is in SYMBOL_FREE_COMMANDS
+        **options: Extra keyword arguments for the handler, e.g. quarters=8
+    
+    Returns:
+        str: JSON string produced by the command handler
+    """
+    handler = COMMANDS.get(command)
+    if handler is None:
+        return json.dumps({"error": f"Unknown command: {command}"})
+    if command not in SYMBOL_FREE_COMMANDS and not symbol:
+        return json.dumps({"error": f"Symbol is required for command: {command}"})
+    if command in ('cache_stats', 'metrics', 'prefetch_status'):
+        return handler(symbol, **options)
+    if command not in SYMBOL_FREE_COMMANDS:
+        _note_request(symbol)
+    # Concurrent identical requests (same command, symbol and options) share
+    # one upstream fetch and all receive its result
+    key = (command, symbol.upper() if symbol else None, json.dumps(options, sort_keys=True, default=str))
+    return _command_flights.do(key, handler, symbol, **options)
+
+# Commands whose per-symbol work splits into a plan (upstream fetches, run on
+# the calling thread) and a render (filtering, currency conversion and
+# serialization) that can run in a worker process: command -> (plan, render)
+PROCESS_COMMANDS = {
+    'financials': (plan_financials, render_financials),
+    'quarterly': (plan_quarterly_financials, render_quarterly_financials),
+}
+
+# Set YFINANCE_PROCESSES=N to render batches of PROCESS_COMMANDS in N worker
+# processes (0 keeps everything in threads)
+PROCESS_WORKERS = int(os.environ.get('YFINANCE_PROCESSES', '0'))
+
+# Start method for the worker processes; forkserver avoids forking a process
+# that already runs fetch threads
+PROCESS_START_METHOD = os.environ.get('YFINANCE_PROCESS_START') or (
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+_process_pools = {}  # worker count -> ProcessPoolExecutor
+_process_pools_lock = threading.Lock()
+
+def _get_process_pool(processes):
+    with _process_pools_lock:
+        pool = _process_pools.get(processes)
+        if pool is None:
+            pool = _process_pools[processes] = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context(PROCESS_START_METHOD),
+            )
+        return pool
+
+def shutdown_process_pools():
+    """Stop the worker processes started for process-mode batches"""
+    with _process_pools_lock:
+        pools = list(_process_pools.values())
+        _process_pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
+
+def _render_in_process(command, symbol, processes, **options):
+    plan, render = PROCESS_COMMANDS[command]
+    try:
+        args = plan(symbol, **options)
+        # The worker returns the finished JSON text, so the result crosses the
+        # process boundary as one string and is spliced into the batch as is
+        with stage('render'):
+            return _get_process_pool(processes).submit(render, *args).result()
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+_PROCESS_HANDLERS = {
+    command: traced(command)(functools.partial(_render_in_process, command))
+    for command in PROCESS_COMMANDS
+}
+
+def run_command_offloaded(command, symbol, processes, **options):
+    """
+    run_command for one of PROCESS_COMMANDS, with the CPU-bound rendering
+    done in a pool of worker processes. The upstream fetches stay on the
+    calling thread, sharing the cache and coalescing with run_command.
+    
+    Args:
+        command (str): One of the keys of PROCESS_COMMANDS
+        symbol (str): Stock symbol
+        processes (int): Size of the worker pool
+        **options: Extra keyword arguments for the handler
+    
+    Returns:
+        str: JSON string, identical to what run_command returns
+    """
+    if command not in PROCESS_COMMANDS:
+        raise ValueError(f"Command can't run in worker processes: {command}")
+    if not symbol:
+        return json.dumps({"error": f"Symbol is required for command: {command}"})
+    _note_request(symbol)
+    key = (command, symbol.upper(), json.dumps(options, sort_keys=True, default=str))
+    return _command_flights.do(key, _PROCESS_HANDLERS[command], symbol, processes, **options)
+
+def _batch_symbols(symbols, command):
+    # A comma-separated string is split; iterating it would yield characters
+    if isinstance(symbols, str):
+        symbols = symbols.split(',')
+    if not isinstance(symbols, (list, tuple)) or not all(isinstance(s, str) for s in symbols):
+        raise ValueError("symbols must be a list of strings or a comma-separated string")
+    symbols = list(dict.fromkeys(s.strip() for s in symbols if s and s.strip()))
+    if command in SYMBOL_FREE_COMMANDS or command not in COMMANDS:
+        raise ValueError(f"Unsupported batch command: {command}")
+    return symbols
+
+def iter_batch(symbols, command='financials', max_workers=8, processes=None, **options):
+    """
+    Run one command for many symbols concurrently, yielding (symbol, JSON
+    string) pairs in completion order. Only about 2 * max_workers symbols are
+    in flight at a time, so memory stays flat however many are requested.
+    
+    Args:
+        symbols (list): Stock symbols; duplicates are fetched once
+        command (str): Per-symbol command, e.g. 'financials', 'quarterly' or 'price'
+        max_workers (int): Upper bound on symbols fetched at the same time
+        processes (int): Render PROCESS_COMMANDS in this many worker
+            processes (defaults to PROCESS_WORKERS; 0 renders in the threads)
+        **options: Extra keyword arguments for the per-symbol handler
+    """
+    symbols = _batch_symbols(symbols, command)
+    processes = PROCESS_WORKERS if processes is None else int(processes)
+    if processes > 0 and command in PROCESS_COMMANDS:
+        run = functools.partial(run_command_offloaded, processes=processes)
+        # Keep enough symbols in flight to give every worker process work
+        max_workers = max(max_workers, processes)
+    else:
+        run = run_command
+    if command == 'price':
+        # Warm the quote cache for the whole batch with a few multi-symbol
+        # requests; the per-symbol handlers below then hit the cache
         try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-            index_data = {'name': name, 'symbol': symbol}
-            for field in fields:
-                index_data[field] = info.get(field)
-            results.append(index_data)
+            fetch_quotes(symbols)
         except Exception as e:
-            results.append({'name': name, 'symbol': symbol, 'error': str(e)})
-    return results
+            print(f"Batched quote request failed: {str(e)}", file=sys.stderr)
+    elif command == 'history':
+        # Fetch the missing bars of the whole batch with multi-symbol downloads
+        try:
+            refresh_history(symbols, start=options.get('start'))
+        except Exception as e:
+            print(f"Batched history request failed: {str(e)}", file=sys.stderr)
+    
+    remaining = iter(symbols)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        pending = {}
+        
+        def submit_next():
+            symbol = next(remaining, None)
+            if symbol is not None:
+                pending[executor.submit(run, command, symbol, **options)] = symbol
+        
+        for _ in range(2 * max(1, max_workers)):
+            submit_next()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                symbol = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = json.dumps({"error": str(e)})
+                submit_next()
+                yield symbol, result
+
+def get_batch(symbols, command='financials', max_workers=8, processes=None, **options):
+    """
+    Run one command for many symbols concurrently
+    
+    Args:
+        symbols (list): Stock symbols; duplicates are fetched once
+        command (str): Per-symbol command, e.g. 'financials', 'quarterly' or 'price'
+        max_workers (int): Upper bound on symbols fetched at the same time
+        processes (int): Worker processes for rendering (see iter_batch)
+        **options: Extra keyword arguments for the per-symbol handler
+    
+    Returns:
+        str: JSON object keyed by symbol. A symbol that fails gets its own
+            {"error": ...} entry instead of aborting the batch.
+    """
+    try:
+        symbols = _batch_symbols(symbols, command)
+    except ValueError as e:
+        return json.dumps({"error": str(e)})
+    
+    results = dict(iter_batch(symbols, command, max_workers=max_workers, processes=processes, **options))
+    # Per-symbol results are already JSON, so join them instead of re-encoding
+    return '{' + ', '.join(f'{json.dumps(symbol)}: {results[symbol]}' for symbol in symbols) + '}'
+
+def iter_ndjson(command='financials', symbols=None, max_workers=8, **options):
+    """
+    Streaming output: one JSON line per symbol (or per index for the
+    'indices' command) as soon as its fetch completes
+    
+    Yields:
+        str: {"symbol": ..., "result": {...}} for batches, or the index dict
+            itself for 'indices' (without trailing newline)
+    """
+    if command == 'indices':
+        indices = parse_index_list(options['indices']) if options.get('indices') else None
+        for index_data in iter_latest_stock_indices(max_workers=max_workers, indices=indices):
+            yield to_json(index_data)
+        return
+    try:
+        for symbol, result in iter_batch(symbols or [], command, max_workers=max_workers, **options):
+            yield '{"symbol": %s, "result": %s}' % (json.dumps(symbol), result)
+    except ValueError as e:
+        yield json.dumps({"error": str(e)})
+
+def write_ndjson(lines, outfile):
+    for line in lines:
+        outfile.write(line + '\n')
+        outfile.flush()
+
+def handle_request_line(line):
+    """
+    Answer one newline-delimited JSON request from --serve mode
+    
+    Requests look like {"id": 1, "command": "price", "symbol": "AAPL"}, or carry
+    a "symbols" list for a batch; the response echoes the id and embeds the
+    command output under "result". With "stream": true, a batch or 'indices'
+    request is answered with one {"id", "symbol", "result"} line per symbol
+    (or {"id", "result"} per index) as each completes, then {"id", "done": true}.
+    
+    Args:
+        line (str): Raw request line
+    
+    Yields:
+        str: Response lines (without the trailing newline)
+    """
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("request must be a JSON object")
+    except ValueError as e:
+        yield json.dumps({"id": None, "error": f"Invalid request: {str(e)}"})
+        return
+    
+    request_id = request.get('id')
+    encoded_id = json.dumps(request_id)
+    try:
+        command = request.get('command', 'financials')
+        options = {name: request[name] for name in COMMAND_OPTIONS.get(command, ()) if name in request}
+        if request.get('stream') and (request.get('symbols') or command == 'indices'):
+            for item in iter_ndjson(command, request.get('symbols'), **options):
+                if command == 'indices':
+                    yield '{"id": %s, "result": %s}' % (encoded_id, item)
+                else:
+                    # Splice the id into the {"symbol": ..., "result": ...} line
+                    yield '{"id": %s, %s' % (encoded_id, item[1:])
+            yield '{"id": %s, "done": true}' % encoded_id
+            return
+        if request.get('symbols'):
+            result = get_batch(request['symbols'], command, **options)
+        else:
+            result = run_command(command, request.get('symbol'), **options)
+    except Exception as e:
+        result = json.dumps({"error": str(e)})
+    # The handlers already return JSON, so splice it in rather than re-parsing
+    yield '{"id": %s, "result": %s}' % (encoded_id, result)
+
+def serve_stream(infile, outfile, max_workers=8):
+    """
+    Serve NDJSON requests read from infile, writing responses to outfile.
+    
+    Requests are answered concurrently, so responses come back in completion
+    order; callers match them up using the request id.
+    """
+    write_lock = threading.Lock()
+    
+    def respond(line):
+        for response in handle_request_line(line):
+            with write_lock:
+                outfile.write(response + '\n')
+                outfile.flush()
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for line in infile:
+            line = line.strip()
+            if line:
+                executor.submit(respond, line)
+
+def serve_unix_socket(path, max_workers=8):
+    """
+    Serve NDJSON requests on a Unix domain socket. Every connection may send
+    any number of request lines; all connections share one worker pool.
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    
+    class RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            write_lock = threading.Lock()
+            pending = []
+            
+            def respond(line):
+                for response in handle_request_line(line):
+                    with write_lock:
+                        self.wfile.write((response + '\n').encode('utf-8'))
+                        self.wfile.flush()
+            
+            for raw_line in self.rfile:
+                line = raw_line.decode('utf-8').strip()
+                if line:
+                    pending.append(executor.submit(respond, line))
+            # Keep the connection open until every response has been written
+            for future in pending:
+                future.exception()
+    
+    _remove_stale_socket(path)
+    server = socketserver.ThreadingUnixStreamServer(path, RequestHandler)
+    server.daemon_threads = True
+    print(f"Serving extractor requests on {path}", file=sys.stderr)
+    if threading.current_thread() is threading.main_thread():
+        # Exit through the cleanup below on SIGTERM too, not only on Ctrl+C
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        executor.shutdown(wait=False)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+def _remove_stale_socket(path):
+    """Delete a socket file left behind by a crashed server, so bind doesn't fail with EADDRINUSE"""
+    try:
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            return  # not ours to delete; bind reports the conflict
+    except FileNotFoundError:
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise OSError(errno.EADDRINUSE, f"Another extractor server is listening on {path}")
+    finally:
+        probe.close()
+
+LAZY_MODULES = (np, pd, yf, http_session, fundamentals_store, derived_metrics, screener, price_history)
+
+def get_startup_profile(load_all=False):
+    """
+    Import timings for cold-start profiling
+    
+    Args:
+        load_all (bool): Import every lazily loaded module that the command
+            run so far did not need, to show its full cost
+    
+    Returns:
+        dict: Seconds spent importing this module (excluding the lazy ones)
+            and each lazily loaded module, in load order. A module is timed
+            however its import was triggered (e.g. pandas by unpickling a
+            cached DataFrame), and each timing excludes the other lazy
+            modules it imported (numpy is counted once).
+    """
+    if load_all:
+        for module in LAZY_MODULES:
+            module.load()
+    return {
+        'extractor_module_seconds': round(_MODULE_READY - _MODULE_STARTED, 4),
+        'lazy_imports_seconds': {name: round(seconds, 4) for name, seconds in import_timings.items()},
+        'not_loaded': [module.__name__ for module in LAZY_MODULES if not module.is_loaded],
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract company financials from Yahoo Finance")
+    parser.add_argument('symbol', nargs='?', help="Stock symbol, e.g. AAPL or INFY.NS")
+    parser.add_argument('command', nargs='?', default='financials',
+                        help="financials (default), quarterly, price, derived or history")
+    parser.add_argument('--symbols',
+                        help="Comma-separated symbols to fetch as one batch; the positional "
+                             "argument is then the command, e.g. --symbols AAPL,MSFT financials")
+    parser.add_argument('--quarters', type=int,
+                        help="Number of recent quarters returned by the quarterly command (default 4)")
+    parser.add_argument('--fields',
+                        help="Financials projection, e.g. 'info.marketCap,income_statement.EBITDA'; "
+                             "sections that aren't named are not fetched. With --screen or the "
+                             "history command, the columns returned")
+    parser.add_argument('--start', help="First date for the history command, e.g. 2024-01-01")
+    parser.add_argument('--end', help="Last date (inclusive) for the history command")
+    parser.add_argument('--layout', choices=LAYOUTS,
+                        help="Statement layout for financials, quarterly and derived: records (default) or "
+                             "columnar (one field list plus a value array per period)")
+    parser.add_argument('--get-latest-indices', action='store_true',
+                        help="Print quotes for the major stock indices")
+    parser.add_argument('--indices',
+                        help="Indices for --get-latest-indices as \"NAME=SYMBOL,...\" "
+                             "(defaults to STOCK_INDICES)")
+    parser.add_argument('--stream', action='store_true',
+                        help="With --symbols or --get-latest-indices, print one JSON line per "
+                             "symbol/index as soon as it is fetched")
+    parser.add_argument('--refresh-universe', metavar='SYMBOLS_OR_FILE',
+                        help="Refresh the fundamentals store (YFINANCE_STORE_DIR) for comma-separated "
+                             "symbols or a file with one symbol per line")
+    parser.add_argument('--screen', metavar='SYMBOLS_OR_FILE',
+                        help="Screen a universe (comma-separated symbols or a file) on info fields "
+                             "with --where, --sort and --top")
+    parser.add_argument('--where',
+                        help="Screener conditions that must all hold, e.g. 'marketCap>1e10,debtToEquity<50'")
+    parser.add_argument('--sort',
+                        help="Screener sort keys, '-' for descending, e.g. '-returnOnEquity,marketCap'")
+    parser.add_argument('--top', type=int, default=50, help="Number of screener matches returned (default 50)")
+    parser.add_argument('--prefetch', metavar='WATCHLIST',
+                        help="Warm caches for a watchlist (comma-separated symbols or a file) on the "
+                             "--at schedules; runs alongside --serve or on its own")
+    parser.add_argument('--at', action='append', default=[], metavar='CRON',
+                        help="Cron schedule for --prefetch, optionally with a time zone, e.g. "
+                             "'14 9 * * 1-5 Asia/Kolkata' (repeatable)")
+    parser.add_argument('--hot-interval', type=float, default=300,
+                        help="Seconds between rolling refreshes of the hot symbols (0 disables, default 300)")
+    parser.add_argument('--hot-count', type=int, default=50,
+                        help="Number of hot symbols renewed per rolling refresh (default 50)")
+    parser.add_argument('--prefetch-now', action='store_true',
+                        help="Also warm the watchlist once at startup")
+    parser.add_argument('--serve', action='store_true',
+                        help="Keep running and answer NDJSON requests on stdin (or --socket)")
+    parser.add_argument('--socket', help="Unix socket path to listen on in --serve mode")
+    parser.add_argument('--workers', type=int, default=8,
+                        help="Number of requests (or batch symbols) processed concurrently")
+    parser.add_argument('--processes', type=int,
+                        help="Render financials/quarterly batches in this many worker processes "
+                             "(default: YFINANCE_PROCESSES, 0 keeps rendering in threads)")
+    parser.add_argument('--cache-stats', action='store_true',
+                        help="Print dataset cache hit/miss counters to stderr before exiting")
+    parser.add_argument('--timings', choices=instrumentation.MODES,
+                        help="Per-stage timings, upstream call counts and payload sizes: as a "
+                             "'timings' block in JSON responses, as metrics lines on stderr, or "
+                             "only aggregated for the 'metrics' command in --serve mode")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="Report import timings: alone, the cost of every heavy module; with a "
+                             "command, what that command loaded (printed to stderr)")
+    return parser.parse_args(argv)
+
+def _cli_options(command, args):
+    options = {}
+    if command == 'quarterly' and args.quarters:
+        options['quarters'] = args.quarters
+    if command == 'financials' and args.fields:
+        options['fields'] = args.fields
+    if command in ('financials', 'quarterly', 'derived') and args.layout:
+        options['layout'] = args.layout
+    if command == 'history':
+        options.update((name, getattr(args, name)) for name in ('start', 'end', 'fields') if getattr(args, name))
+    return options
+
+_MODULE_READY = time.perf_counter()
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "--get-latest-indices":
-            indices = get_latest_stock_indices()
-            print(json.dumps(indices, ensure_ascii=False))
+    args = parse_args()
+    if args.timings:
+        instrumentation.configure(args.timings)
+    if args.processes is not None:
+        PROCESS_WORKERS = args.processes
+    if args.prefetch:
+        # Reports go to stderr alongside --serve, where stdout carries responses
+        report_to = sys.stderr if args.serve else sys.stdout
+        _scheduler = make_prefetch_scheduler(
+            args.prefetch, args.at, hot_interval=args.hot_interval, hot_count=args.hot_count,
+            max_workers=args.workers, report=lambda report: prefetch_scheduler.print_report(report, report_to),
+        )
+        if args.prefetch_now:
+            _scheduler.run_now('startup')
+    if args.prefetch and not args.serve:
+        try:
+            _scheduler.run_forever()
+        except KeyboardInterrupt:
+            pass
+    elif args.serve:
+        if args.prefetch:
+            _scheduler.start()
+        if args.socket:
+            serve_unix_socket(args.socket, max_workers=args.workers)
         else:
-            symbol = sys.argv[1]
-            command = sys.argv[2] if len(sys.argv) > 2 else "financials"
-            if command == "price":
-                print(get_company_latestPrice(symbol))
-            elif command == "quarterly":
-                print(get_company_quarterly_financials(symbol))
-            else:
-                print(get_company_financials(symbol))
+            serve_stream(sys.stdin, sys.stdout, max_workers=args.workers)
+    elif args.refresh_universe:
+        print(json.dumps(refresh_universe(read_symbol_list(args.refresh_universe), max_workers=args.workers)))
+    elif args.screen:
+        print(get_screener(args.screen, where=args.where, sort=args.sort, top=args.top,
+                           fields=args.fields, max_workers=args.workers))
+    elif args.symbols:
+        command = args.symbol or 'financials'
+        options = _cli_options(command, args)
+        if args.stream:
+            write_ndjson(iter_ndjson(command, args.symbols.split(','), max_workers=args.workers, **options), sys.stdout)
+        else:
+            print(get_batch(args.symbols.split(','), command, max_workers=args.workers, **options))
+    elif args.get_latest_indices and args.stream:
+        write_ndjson(iter_ndjson('indices', max_workers=args.workers, indices=args.indices), sys.stdout)
+    elif args.get_latest_indices:
+        indices = get_latest_stock_indices(args.indices)
+        print(to_json(indices))
+    elif args.symbol:
+        command = args.command if args.command in COMMANDS else 'financials'
+        options = _cli_options(command, args)
+        print(run_command(command, args.symbol, **options))
+    elif args.profile_startup:
+        print(json.dumps(get_startup_profile(load_all=True)))
+    if args.cache_stats:
+        print(json.dumps(get_cache_stats()), file=sys.stderr)
+    if args.profile_startup and (args.symbol or args.symbols or args.get_latest_indices):
+        print(json.dumps(get_startup_profile()), file=sys.stderr)